@@ -14,12 +14,17 @@
 
 from __future__ import print_function
 
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from thrift.TSerialization import serialize
 from twitter.common import log
 
 from apache.aurora.common.aurora_job_key import AuroraJobKey
 from apache.aurora.common.cluster import Cluster
 
 from .restarter import Restarter
+from .result_cache import ResultCache
 from .scheduler_client import SchedulerProxy
 from .sla import Sla
 from .updater_util import UpdaterConfig
@@ -39,6 +44,37 @@ from gen.apache.aurora.api.ttypes import (
 )
 
 
+def _log_full_configuration(config):
+  # Building the job thrift is not free; skip it unless it will actually be logged.
+  if log.logger().isEnabledFor(log.DEBUG):
+    log.debug('Full configuration: %s', config.job())
+
+
+class KillBatch(object):
+  """
+    Collects the kills made through its kill_job within AuroraClientAPI.batched() so that kills
+    against the same job (and with the same audit message) are issued as a single killTasks RPC.
+  """
+
+  def __init__(self, kill_instances):
+    self._kill_instances = kill_instances
+    self._kills = OrderedDict()  # (job_key, message) => frozenset of instances or None for all
+    self.responses = []
+
+  def kill_job(self, job_key, instances=None, message=None):
+    """Buffers a kill.  Takes the same arguments as AuroraClientAPI.kill_job."""
+    instances = self._kill_instances(job_key, instances)
+    key = (job_key, message)
+    if key in self._kills:
+      pending = self._kills[key]
+      instances = None if pending is None or instances is None else pending | instances
+    self._kills[key] = instances
+
+  def __iter__(self):
+    for (job_key, message), instances in self._kills.items():
+      yield job_key, instances, message
+
+
 class AuroraClientAPI(object):
   """This class provides the API to talk to the twitter scheduler"""
 
@@ -52,7 +88,13 @@ class AuroraClientAPI(object):
       cluster,
       user_agent,
       verbose=False,
-      bypass_leader_redirect=False):
+      bypass_leader_redirect=False,
+      result_cache_ttl=None):
+    """
+      If result_cache_ttl (an Amount of Time) is given, the results of read-only calls (query,
+      query_no_configs, get_jobs, get_quota and maintenance_status) are cached for that long
+      and shared between concurrent callers.  Any mutating call invalidates the cache.
+    """
 
     if not isinstance(cluster, Cluster):
       raise TypeError('AuroraClientAPI expects instance of Cluster for "cluster", got %s' %
@@ -64,6 +106,7 @@ class AuroraClientAPI(object):
         user_agent=user_agent,
         bypass_leader_redirect=bypass_leader_redirect)
     self._cluster = cluster
+    self._result_cache = ResultCache(ttl=result_cache_ttl) if result_cache_ttl else None
 
   @property
   def cluster(self):
@@ -73,19 +116,60 @@ class AuroraClientAPI(object):
   def scheduler_proxy(self):
     return self._scheduler_proxy
 
+  @contextmanager
+  def batched(self):
+    """Yields a KillBatch whose kill_job calls are buffered and issued when the context exits,
+       merging the instances of kills against the same job and message into one killTasks RPC.
+
+       The scheduler responses are available from the batch's responses list once the context
+       exits.  If the context exits with an exception, the buffered kills are discarded.  Every
+       buffered kill is attempted even if an earlier one fails; responses holds the results of
+       the kills that succeeded and the first failure is raised once all have been attempted.
+       Calls to AuroraClientAPI.kill_job itself are never buffered.
+    """
+    batch = KillBatch(self._kill_instances)
+    yield batch
+    error = None
+    for job_key, instances, message in batch:
+      try:
+        batch.responses.append(self._kill_tasks(job_key, instances, message))
+      except Exception as e:
+        log.error('Failed to kill tasks for job %s: %s', job_key, e)
+        error = error or e
+    if error is not None:
+      raise error
+
+  def invalidate_cache(self):
+    if self._result_cache is not None:
+      self._result_cache.invalidate()
+
+  def _mutating_call(self, fn):
+    # Invalidate once the call completes so reads racing with it cannot repopulate stale results.
+    try:
+      return fn()
+    finally:
+      self.invalidate_cache()
+
+  def _cached_call(self, method_name, arg, fn):
+    if self._result_cache is None:
+      return fn()
+    # thrift structs do not hash by value, so key on their serialized form.
+    key = serialize(arg) if hasattr(arg, 'thrift_spec') else arg
+    return self._result_cache.get((method_name, key), fn)
+
   def create_job(self, config):
-    log.info('Creating job %s' % config.name())
-    log.debug('Full configuration: %s' % config.job())
-    return self._scheduler_proxy.createJob(config.job())
+    log.info('Creating job %s', config.name())
+    _log_full_configuration(config)
+    return self._mutating_call(lambda: self._scheduler_proxy.createJob(config.job()))
 
   def schedule_cron(self, config):
-    log.info("Registering job %s with cron" % config.name())
-    log.debug('Full configuration: %s' % config.job())
-    return self._scheduler_proxy.scheduleCronJob(config.job())
+    log.info("Registering job %s with cron", config.name())
+    _log_full_configuration(config)
+    return self._mutating_call(lambda: self._scheduler_proxy.scheduleCronJob(config.job()))
 
   def deschedule_cron(self, jobkey):
-    log.info("Removing cron schedule for job %s" % jobkey)
-    return self._scheduler_proxy.descheduleCronJob(jobkey.to_thrift())
+    log.info("Removing cron schedule for job %s", jobkey)
+    return self._mutating_call(lambda: self._scheduler_proxy.descheduleCronJob(jobkey.to_thrift()))
 
   def populate_job_config(self, config):
     # read-only calls are retriable.
@@ -94,33 +178,43 @@ class AuroraClientAPI(object):
   def start_cronjob(self, job_key):
     self._assert_valid_job_key(job_key)
 
-    log.info("Starting cron job: %s" % job_key)
-    return self._scheduler_proxy.startCronJob(job_key.to_thrift())
+    log.info("Starting cron job: %s", job_key)
+    return self._mutating_call(lambda: self._scheduler_proxy.startCronJob(job_key.to_thrift()))
 
   def get_jobs(self, role):
-    log.info("Retrieving jobs for role %s" % role)
+    log.info("Retrieving jobs for role %s", role)
     # read-only calls are retriable.
-    return self._scheduler_proxy.getJobs(role, retry=True)
+    return self._cached_call(
+        'getJobs', role, lambda: self._scheduler_proxy.getJobs(role, retry=True))
 
   def add_instances(self, job_key, instance_id, count):
     key = InstanceKey(jobKey=job_key.to_thrift(), instanceId=instance_id)
-    log.info("Adding %s instances to %s using the task config of instance %s"
-             % (count, job_key, instance_id))
-    return self._scheduler_proxy.addInstances(key, count)
+    log.info("Adding %s instances to %s using the task config of instance %s",
+             count, job_key, instance_id)
+    return self._mutating_call(lambda: self._scheduler_proxy.addInstances(key, count))
 
   def kill_job(self, job_key, instances=None, message=None):
-    log.info("Killing tasks for job: %s" % job_key)
+    instances = self._kill_instances(job_key, instances)
+    return self._kill_tasks(job_key, instances, message)
+
+  def _kill_instances(self, job_key, instances):
     self._assert_valid_job_key(job_key)
 
     if instances is not None:
-      log.info("Instances to be killed: %s" % instances)
-      instances = frozenset([int(s) for s in instances])
-    return self._scheduler_proxy.killTasks(job_key.to_thrift(), instances, message)
+      instances = frozenset(map(int, instances))
+    return instances
+
+  def _kill_tasks(self, job_key, instances, message):
+    log.info("Killing tasks for job: %s", job_key)
+    if instances is not None:
+      log.info("Instances to be killed: %s", instances)
+    return self._mutating_call(
+        lambda: self._scheduler_proxy.killTasks(job_key.to_thrift(), instances, message))
 
   def check_status(self, job_key):
     self._assert_valid_job_key(job_key)
 
-    log.info("Checking status of %s" % job_key)
+    log.info("Checking status of %s", job_key)
     return self.query_no_configs(job_key.to_thrift_query())
 
   @classmethod
@@ -132,7 +226,10 @@ class AuroraClientAPI(object):
   def query(self, query):
     try:
       # read-only calls are retriable.
-      return self._scheduler_proxy.getTasksStatus(query, retry=True)
+      return self._cached_call(
+          'getTasksStatus',
+          query,
+          lambda: self._scheduler_proxy.getTasksStatus(query, retry=True))
     except SchedulerProxy.ThriftInternalError as e:
       raise self.ThriftInternalError(e.args[0])
 
@@ -140,7 +237,10 @@ class AuroraClientAPI(object):
     """Returns all matching tasks without TaskConfig.executorConfig set."""
     try:
       # read-only calls are retriable.
-      return self._scheduler_proxy.getTasksWithoutConfigs(query, retry=True)
+      return self._cached_call(
+          'getTasksWithoutConfigs',
+          query,
+          lambda: self._scheduler_proxy.getTasksWithoutConfigs(query, retry=True))
     except SchedulerProxy.ThriftInternalError as e:
       raise self.ThriftInternalError(e.args[0])
 
@@ -169,10 +269,11 @@ class AuroraClientAPI(object):
     Returns response object with update ID and acquired job lock.
     """
     request = self._job_update_request(config, instances, metadata)
-    log.info("Starting update for: %s" % config.name())
+    log.info("Starting update for: %s", config.name())
     # retring starting a job update is safe, client and scheduler reconcile state if the
     # job update is in progress (AURORA-1711).
-    return self._scheduler_proxy.startJobUpdate(request, message, retry=True)
+    return self._mutating_call(
+        lambda: self._scheduler_proxy.startJobUpdate(request, message, retry=True))
 
   def pause_job_update(self, update_key, message):
     """Requests Scheduler to pause active job update.
@@ -183,7 +284,7 @@ class AuroraClientAPI(object):
 
     Returns response object.
     """
-    return self._scheduler_proxy.pauseJobUpdate(update_key, message)
+    return self._mutating_call(lambda: self._scheduler_proxy.pauseJobUpdate(update_key, message))
 
   def resume_job_update(self, update_key, message):
     """Requests Scheduler to resume a job update paused previously.
@@ -194,7 +295,7 @@ class AuroraClientAPI(object):
 
     Returns response object.
     """
-    return self._scheduler_proxy.resumeJobUpdate(update_key, message)
+    return self._mutating_call(lambda: self._scheduler_proxy.resumeJobUpdate(update_key, message))
 
   def abort_job_update(self, update_key, message):
     """Requests Scheduler to abort active or paused job update.
@@ -205,7 +306,7 @@ class AuroraClientAPI(object):
 
     Returns response object.
     """
-    return self._scheduler_proxy.abortJobUpdate(update_key, message)
+    return self._mutating_call(lambda: self._scheduler_proxy.abortJobUpdate(update_key, message))
 
   def rollback_job_update(self, update_key, message):
     """Requests Scheduler to rollback active job update.
@@ -216,7 +317,7 @@ class AuroraClientAPI(object):
 
     Returns response object.
     """
-    return self._scheduler_proxy.rollbackJobUpdate(update_key, message)
+    return self._mutating_call(lambda: self._scheduler_proxy.rollbackJobUpdate(update_key, message))
 
   def get_job_update_diff(self, config, instances=None):
     """Requests scheduler to calculate difference between scheduler and client job views.
@@ -229,7 +330,7 @@ class AuroraClientAPI(object):
     Returns response object with job update diff results.
     """
     request = self._job_update_request(config, instances)
-    log.debug("Requesting job update diff details for: %s" % config.name())
+    log.debug("Requesting job update diff details for: %s", config.name())
     # read-only calls are retriable.
     return self._scheduler_proxy.getJobUpdateDiff(request, retry=True)
 
@@ -288,39 +389,44 @@ class AuroraClientAPI(object):
     """
     self._assert_valid_job_key(job_key)
 
-    return Restarter(job_key, restart_settings, self._scheduler_proxy).restart(instances)
+    return self._mutating_call(
+        lambda: Restarter(job_key, restart_settings, self._scheduler_proxy).restart(instances))
 
   def start_maintenance(self, hosts):
-    log.info("Starting maintenance for: %s" % hosts.hostNames)
-    return self._scheduler_proxy.startMaintenance(hosts)
+    log.info("Starting maintenance for: %s", hosts.hostNames)
+    return self._mutating_call(lambda: self._scheduler_proxy.startMaintenance(hosts))
 
   def drain_hosts(self, hosts):
-    log.info("Draining tasks on: %s" % hosts.hostNames)
-    return self._scheduler_proxy.drainHosts(hosts)
+    log.info("Draining tasks on: %s", hosts.hostNames)
+    return self._mutating_call(lambda: self._scheduler_proxy.drainHosts(hosts))
 
   def maintenance_status(self, hosts):
-    log.info("Maintenance status for: %s" % hosts.hostNames)
+    log.info("Maintenance status for: %s", hosts.hostNames)
     # read-only calls are retriable.
-    return self._scheduler_proxy.maintenanceStatus(hosts, retry=True)
+    return self._cached_call(
+        'maintenanceStatus',
+        hosts,
+        lambda: self._scheduler_proxy.maintenanceStatus(hosts, retry=True))
 
   def end_maintenance(self, hosts):
-    log.info("Ending maintenance for: %s" % hosts.hostNames)
-    return self._scheduler_proxy.endMaintenance(hosts)
+    log.info("Ending maintenance for: %s", hosts.hostNames)
+    return self._mutating_call(lambda: self._scheduler_proxy.endMaintenance(hosts))
 
   def get_quota(self, role):
-    log.info("Getting quota for: %s" % role)
+    log.info("Getting quota for: %s", role)
     # read-only calls are retriable.
-    return self._scheduler_proxy.getQuota(role, retry=True)
+    return self._cached_call(
+        'getQuota', role, lambda: self._scheduler_proxy.getQuota(role, retry=True))
 
   def set_quota(self, role, cpu, ram, disk):
-    log.info("Setting quota for user:%s cpu:%f ram:%d disk: %d"
-              % (role, cpu, ram, disk))
-    return self._scheduler_proxy.setQuota(
-        role,
-        ResourceAggregate(cpu, ram, disk, frozenset([
-            Resource(numCpus=cpu),
-            Resource(ramMb=ram),
-            Resource(diskMb=disk)])))
+    log.info("Setting quota for user:%s cpu:%f ram:%d disk: %d", role, cpu, ram, disk)
+    return self._mutating_call(
+        lambda: self._scheduler_proxy.setQuota(
+            role,
+            ResourceAggregate(cpu, ram, disk, frozenset([
+                Resource(numCpus=cpu),
+                Resource(ramMb=ram),
+                Resource(diskMb=disk)]))))
 
   def get_tier_configs(self):
     log.debug("Getting tier configurations")
@@ -328,8 +434,8 @@ class AuroraClientAPI(object):
     return self._scheduler_proxy.getTierConfigs(retry=True)
 
   def force_task_state(self, task_id, status):
-    log.info("Requesting that task %s transition to state %s" % (task_id, status))
-    return self._scheduler_proxy.forceTaskState(task_id, status)
+    log.info("Requesting that task %s transition to state %s", task_id, status)
+    return self._mutating_call(lambda: self._scheduler_proxy.forceTaskState(task_id, status))
 
   def perform_backup(self):
     return self._scheduler_proxy.performBackup()
@@ -338,29 +444,29 @@ class AuroraClientAPI(object):
     return self._scheduler_proxy.listBackups()
 
   def stage_recovery(self, backup_id):
-    return self._scheduler_proxy.stageRecovery(backup_id)
+    return self._mutating_call(lambda: self._scheduler_proxy.stageRecovery(backup_id))
 
   def query_recovery(self, query):
     # read-only calls are retriable.
     return self._scheduler_proxy.queryRecovery(query, retry=True)
 
   def delete_recovery_tasks(self, query):
-    return self._scheduler_proxy.deleteRecoveryTasks(query)
+    return self._mutating_call(lambda: self._scheduler_proxy.deleteRecoveryTasks(query))
 
   def commit_recovery(self):
-    return self._scheduler_proxy.commitRecovery()
+    return self._mutating_call(lambda: self._scheduler_proxy.commitRecovery())
 
   def unload_recovery(self):
-    return self._scheduler_proxy.unloadRecovery()
+    return self._mutating_call(lambda: self._scheduler_proxy.unloadRecovery())
 
   def snapshot(self):
     return self._scheduler_proxy.snapshot()
 
   def prune_tasks(self, query):
-    return self._scheduler_proxy.pruneTasks(query)
+    return self._mutating_call(lambda: self._scheduler_proxy.pruneTasks(query))
 
   def unsafe_rewrite_config(self, rewrite_request):
-    return self._scheduler_proxy.rewriteConfigs(rewrite_request)
+    return self._mutating_call(lambda: self._scheduler_proxy.rewriteConfigs(rewrite_request))
 
   def sla_get_job_uptime_vector(self, job_key):
     self._assert_valid_job_key(job_key)
@@ -373,11 +479,11 @@ class AuroraClientAPI(object):
         hosts)
 
   def reconcile_explicit(self, batch_size):
-    return self._scheduler_proxy.triggerExplicitTaskReconciliation(
-      ExplicitReconciliationSettings(batchSize=batch_size))
+    return self._mutating_call(lambda: self._scheduler_proxy.triggerExplicitTaskReconciliation(
+        ExplicitReconciliationSettings(batchSize=batch_size)))
 
   def reconcile_implicit(self):
-    return self._scheduler_proxy.triggerImplicitTaskReconciliation()
+    return self._mutating_call(lambda: self._scheduler_proxy.triggerImplicitTaskReconciliation())
 
   def _assert_valid_job_key(self, job_key):
     if not isinstance(job_key, AuroraJobKey):
@@ -0,0 +1,109 @@
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import threading
+import time
+
+from twitter.common.quantity import Amount, Time
+
+
+class _InflightCall(object):
+  """A call that is currently being issued on behalf of every caller waiting on its key."""
+
+  def __init__(self):
+    self._done = threading.Event()
+    self._result = None
+    self._error = None
+
+  def set_result(self, result):
+    self._result = result
+    self._done.set()
+
+  def set_error(self, error):
+    self._error = error
+    self._done.set()
+
+  def wait(self):
+    self._done.wait()
+    if self._error is not None:
+      raise self._error
+    return self._result
+
+
+class ResultCache(object):
+  """
+    A thread-safe cache of results of read-only scheduler calls that expire after a fixed TTL.
+
+    Concurrent misses for the same key are coalesced: the first caller issues the call while
+    the others wait for and share its result.  Cached results are shared between callers and
+    must not be modified.
+  """
+
+  DEFAULT_TTL = Amount(2, Time.SECONDS)
+  DEFAULT_MAX_SIZE = 1024
+
+  def __init__(self, ttl=DEFAULT_TTL, max_size=DEFAULT_MAX_SIZE, clock=time):
+    self._ttl = ttl.as_(Time.SECONDS)
+    self._max_size = max_size
+    self._clock = clock
+    self._entries = {}  # key => (expiration, result)
+    self._inflight = {}  # key => _InflightCall
+    self._lock = threading.Lock()
+
+  def get(self, key, fn):
+    """Return the cached result for key, calling fn() to populate it if absent or expired."""
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is not None and entry[0] > self._clock.time():
+        return entry[1]
+      call = self._inflight.get(key)
+      owner = call is None
+      if owner:
+        call = self._inflight[key] = _InflightCall()
+
+    if not owner:
+      return call.wait()
+
+    try:
+      result = fn()
+    except Exception as e:
+      with self._lock:
+        # After an invalidation the key may already belong to a newer call; leave that one be.
+        if self._inflight.get(key) is call:
+          del self._inflight[key]
+      call.set_error(e)
+      raise
+
+    with self._lock:
+      # An invalidation that raced with this call drops the in-flight marker; do not cache a
+      # result that may predate it.
+      if self._inflight.get(key) is call:
+        del self._inflight[key]
+        self._store(key, result)
+    call.set_result(result)
+    return result
+
+  def _store(self, key, result):
+    now = self._clock.time()
+    if len(self._entries) >= self._max_size:
+      self._entries = dict((k, v) for k, v in self._entries.items() if v[0] > now)
+      if len(self._entries) >= self._max_size:
+        self._entries.clear()
+    self._entries[key] = (now + self._ttl, result)
+
+  def invalidate(self):
+    """Drop every cached result."""
+    with self._lock:
+      self._entries.clear()
+      self._inflight.clear()
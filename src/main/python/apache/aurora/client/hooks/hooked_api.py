@@ -154,6 +154,9 @@ class HookedAuroraClientAPI(NonHookedAuroraClientAPI):
 
     return resp
 
+  def batched(self):
+    raise self.Error('Hooked API calls cannot be batched: hooks require per-call responses.')
+
   def create_job(self, config):
     return self._hooked_call(config, None,
         _partial(super(HookedAuroraClientAPI, self).create_job, config))
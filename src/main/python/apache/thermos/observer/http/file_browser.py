@@ -71,7 +71,7 @@ class TaskObserverFileBrowser(object):
   """
 
   @HttpServer.route("/logs/:task_id/:process/:run/:logtype")
-  @HttpServer.mako_view(HttpTemplate.load('logbrowse'))
+  @HttpServer.mako_view(HttpTemplate.compile('logbrowse'))
   def handle_logs(self, task_id, process, run, logtype):
     types = self._observer.logs(task_id, process, int(run))
     if logtype not in types:
@@ -97,7 +97,7 @@ class TaskObserverFileBrowser(object):
     return _read_chunk(os.path.join(chroot, path), offset, length)
 
   @HttpServer.route("/file/:task_id/:path#.+#")
-  @HttpServer.mako_view(HttpTemplate.load('filebrowse'))
+  @HttpServer.mako_view(HttpTemplate.compile('filebrowse'))
   def handle_file(self, task_id, path):
     if path is None:
       bottle.abort(404, "No such file")
@@ -119,7 +119,7 @@ class TaskObserverFileBrowser(object):
 
   @HttpServer.route("/browse/:task_id")
   @HttpServer.route("/browse/:task_id/:path#.*#")
-  @HttpServer.mako_view(HttpTemplate.load('filelist'))
+  @HttpServer.mako_view(HttpTemplate.compile('filelist'))
   def handle_dir(self, task_id, path=None):
     if path == "":
       path = None
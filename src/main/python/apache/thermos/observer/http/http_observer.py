@@ -19,120 +19,166 @@ system. To do this, it relies heavily on the Thermos TaskObserver.
 
 """
 
+from __future__ import absolute_import
+
+import re
 import socket
+import time
+from json import JSONEncoder
 
+from bottle import HTTPResponse, SimpleTemplate, parse_date
+from mako.filters import html_escape
+from mako.template import Template
 from twitter.common import log
 from twitter.common.http import HttpServer
+from twitter.common.quantity import Amount, Time
 
 from .file_browser import TaskObserverFileBrowser
 from .json import TaskObserverJSONBindings
+from .lookup_cache import LookupCache
 from .static_assets import StaticAssets
 from .templating import HttpTemplate
 
+# The hostname does not change over the lifetime of the observer.
+HOSTNAME = socket.gethostname()
+
 
 class BottleObserver(HttpServer, StaticAssets, TaskObserverFileBrowser, TaskObserverJSONBindings):
   """
     A bottle wrapper around a Thermos TaskObserver.
   """
 
+  TASK_TYPES = frozenset((None, 'all', 'finished', 'active'))
+  # Offsets may be negative, see TaskObserver.main.
+  INTEGER_RE = re.compile(r'-?\d+$')
+  # How long the result of a task lookup is shared with subsequent requests.
+  LOOKUP_TTL = Amount(500, Time.MILLISECONDS)
+  RAWTASK_TEMPLATE = Template(HttpTemplate.load('rawtask'))
+  RAWTASK_ENCODER = JSONEncoder(indent=4)
+
   def __init__(self, observer):
     self._observer = observer
+    # Observer calls are serialized on its lock, so concurrent viewers of a task share lookups.
+    self._lookups = LookupCache(self.LOOKUP_TTL)
     StaticAssets.__init__(self)
     TaskObserverFileBrowser.__init__(self)
     TaskObserverJSONBindings.__init__(self)
     HttpServer.__init__(self)
 
   @HttpServer.route("/")
-  @HttpServer.view(HttpTemplate.load('index'))
+  @HttpServer.view(HttpTemplate.compile('index', template_adapter=SimpleTemplate))
   def handle_index(self):
-    return dict(hostname=socket.gethostname())
+    return dict(hostname=HOSTNAME)
 
   @HttpServer.route("/main")
   @HttpServer.route("/main/:type")
   @HttpServer.route("/main/:type/:offset")
   @HttpServer.route("/main/:type/:offset/:num")
-  @HttpServer.mako_view(HttpTemplate.load('main'))
+  @HttpServer.mako_view(HttpTemplate.compile('main'))
   def handle_main(self, type=None, offset=None, num=None):
-    if type not in (None, 'all', 'finished', 'active'):
+    if type not in self.TASK_TYPES:
       HttpServer.abort(404, 'Invalid task type: %s' % type)
     if offset is not None:
-      try:
-        offset = int(offset)
-      except ValueError:
+      if not self.INTEGER_RE.match(offset):
         HttpServer.abort(404, 'Invalid offset: %s' % offset)
+      offset = int(offset)
     if num is not None:
-      try:
-        num = int(num)
-      except ValueError:
+      if not self.INTEGER_RE.match(num):
         HttpServer.abort(404, 'Invalid count: %s' % num)
+      num = int(num)
     return self._observer.main(type, offset, num)
 
   @HttpServer.route("/task/:task_id")
-  @HttpServer.mako_view(HttpTemplate.load('task'))
+  @HttpServer.mako_view(HttpTemplate.compile('task'))
   def handle_task(self, task_id):
-    task = self.get_task(task_id)
-    processes = self._observer.processes([task_id])
-    if not processes.get(task_id, None):
+    not_modified = self._check_not_modified(task_id)
+    if not_modified is not None:
+      return not_modified
+    snapshot = self._lookups.get(('snapshot', task_id), lambda: self._observer.snapshot(task_id))
+    if snapshot is None or not snapshot.task:
+      HttpServer.abort(404, "Failed to find task %s.  Try again shortly." % task_id)
+    if not snapshot.processes:
       HttpServer.abort(404, 'Unknown task_id: %s' % task_id)
-    processes = processes[task_id]
-    state = self._observer.state(task_id)
+    task, state = snapshot.task, snapshot.state
 
     return dict(
       task_id=task_id,
       task=task,
-      statuses=self._observer.task_statuses(task_id),
+      statuses=snapshot.statuses,
       user=task['user'],
       ports=task['ports'],
-      processes=processes,
+      processes=snapshot.processes,
       chroot=state.get('sandbox', ''),
       launch_time=state.get('launch_time', 0),
       hostname=state.get('hostname', 'localhost'),
     )
 
+  def _check_not_modified(self, task_id):
+    """
+      Return a 304 response if the client already has the current page of a finished task,
+      otherwise mark the response with the task's Last-Modified time and return None.
+    """
+    mtime = self._observer.task_mtime(task_id)
+    if mtime is None:
+      return None
+    if_modified_since = HttpServer.Request.headers.get('If-Modified-Since')
+    if if_modified_since:
+      since = parse_date(if_modified_since)
+      if since is not None and int(mtime) <= since:
+        return HTTPResponse(status=304)
+    # bottle 0.11 has no http_date; format the date the way its static_file does.
+    HttpServer.Response.set_header(
+        'Last-Modified', time.strftime('%a, %d %b %Y %H:%M:%S GMT', time.gmtime(mtime)))
+    return None
+
   def get_task(self, task_id):
-    task = self._observer._task(task_id)
+    task = self._lookups.get(('task', task_id), lambda: self._observer._task(task_id))
     if not task:
       HttpServer.abort(404, "Failed to find task %s.  Try again shortly." % task_id)
     return task
 
   @HttpServer.route("/rawtask/:task_id")
-  @HttpServer.mako_view(HttpTemplate.load('rawtask'))
   def handle_rawtask(self, task_id):
+    not_modified = self._check_not_modified(task_id)
+    if not_modified is not None:
+      return not_modified
     task = self.get_task(task_id)
     state = self._observer.state(task_id)
-    return dict(
-      hostname=state.get('hostname', 'localhost'),
-      task_id=task_id,
-      task_struct=task['task_struct']
-    )
+    head = self.RAWTASK_TEMPLATE.get_def('head').render(
+        state.get('hostname', 'localhost'), task_id)
+    return self._stream_rawtask(head, task['task_struct'].get())
+
+  def _stream_rawtask(self, head, task):
+    """
+      Stream the page as it is encoded, rather than holding the task struct's JSON (and its
+      escaped copy) in memory alongside the rendered page.
+    """
+    yield head
+    for chunk in self.RAWTASK_ENCODER.iterencode(task):
+      yield html_escape(chunk)
+    yield self.RAWTASK_TEMPLATE.get_def('tail').render()
 
   @HttpServer.route("/process/:task_id/:process_id")
-  @HttpServer.mako_view(HttpTemplate.load('process'))
+  @HttpServer.mako_view(HttpTemplate.compile('process'))
   def handle_process(self, task_id, process_id):
-    all_processes = {}
-    current_run = self._observer.process(task_id, process_id)
+    current_run, process, runs = self._observer.process_bundle(task_id, process_id)
     if not current_run:
       HttpServer.abort(404, 'Invalid task/process combination: %s/%s' % (task_id, process_id))
-    process = self._observer.process_from_name(task_id, process_id)
     if process is None:
       msg = 'Could not recover process: %s/%s' % (task_id, process_id)
       log.error(msg)
       HttpServer.abort(404, msg)
 
-    current_run_number = current_run['process_run']
-    all_processes[current_run_number] = current_run
-    for run in range(current_run_number):
-      all_processes[run] = self._observer.process(task_id, process_id, run)
-
     template = {
+      'hostname': HOSTNAME,
       'task_id': task_id,
       'process': {
          'name': process_id,
-         'status': all_processes[current_run_number]["state"],
+         'status': current_run['state'],
          'cmdline': process.cmdline().get()
       },
     }
-    template['process'].update(**all_processes[current_run_number].get('used', {}))
-    template['runs'] = all_processes
-    log.debug('Rendering template is: %s' % template)
+    template['process'].update(**current_run.get('used', {}))
+    template['runs'] = runs
+    log.debug('Rendering template is: %s', template)
     return template
@@ -0,0 +1,80 @@
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import threading
+import time
+
+from twitter.common.quantity import Time
+
+
+class _PendingLookup(object):
+  def __init__(self):
+    self.done = threading.Event()
+    self.result = None
+    self.error = None
+
+  def wait(self):
+    self.done.wait()
+    if self.error is not None:
+      raise self.error
+    return self.result
+
+
+class LookupCache(object):
+  """
+    Shares the result of a lookup with every request for the same key that arrives while it is
+    running, or within ttl of it completing.  If the lookup fails, the requests waiting on it
+    fail with the same error and nothing is remembered.
+  """
+
+  def __init__(self, ttl, clock=time):
+    self._ttl = ttl.as_(Time.SECONDS)
+    self._clock = clock
+    self._results = {}  # key => (expiration, result)
+    self._pending = {}  # key => _PendingLookup
+    self._lock = threading.Lock()
+
+  def get(self, key, fn):
+    """Return the result of fn(), or that of a recent or running lookup of key."""
+    with self._lock:
+      expiration, result = self._results.get(key, (0, None))
+      if expiration > self._clock.time():
+        return result
+      pending = self._pending.get(key)
+      owner = pending is None
+      if owner:
+        pending = self._pending[key] = _PendingLookup()
+
+    if not owner:
+      return pending.wait()
+
+    try:
+      pending.result = fn()
+    except Exception as e:
+      pending.error = e
+      raise
+    else:
+      with self._lock:
+        self._expire()
+        self._results[key] = (self._clock.time() + self._ttl, pending.result)
+      return pending.result
+    finally:
+      with self._lock:
+        del self._pending[key]
+      pending.done.set()
+
+  def _expire(self):
+    now = self._clock.time()
+    for key in [key for key, (expiration, _) in self._results.items() if expiration <= now]:
+      del self._results[key]
@@ -12,13 +12,48 @@
 # limitations under the License.
 #
 
+import gzip
+import hashlib
 import mimetypes
 import os
+from collections import namedtuple
+from io import BytesIO
 
 import pkg_resources
 from bottle import HTTPResponse
 from twitter.common import log
 from twitter.common.http.server import HttpServer
+from twitter.common.quantity import Amount, Time
+
+Asset = namedtuple('Asset', 'etag body headers gzip_body gzip_headers')
+
+
+def gzip_compress(data):
+  buf = BytesIO()
+  with gzip.GzipFile(fileobj=buf, mode='wb', compresslevel=9) as fp:
+    fp.write(data)
+  return buf.getvalue()
+
+
+def accepts_gzip(accept_encoding):
+  """Return whether an Accept-Encoding header value allows a gzip encoded response."""
+  qvalues = {}
+  for coding in accept_encoding.split(','):
+    params = coding.split(';')
+    name = params[0].strip().lower()
+    qvalue = 1.0
+    for param in params[1:]:
+      key, _, value = param.partition('=')
+      if key.strip().lower() == 'q':
+        try:
+          qvalue = float(value)
+        except ValueError:
+          qvalue = 0.0
+    qvalues[name] = qvalue
+  for name in ('gzip', '*'):
+    if name in qvalues:
+      return qvalues[name] > 0
+  return False
 
 
 class StaticAssets(object):
@@ -26,18 +61,47 @@ class StaticAssets(object):
     Serve the /assets directory.
   """
 
+  MAX_AGE = Amount(1, Time.DAYS)
+
   def __init__(self):
     self._assets = {}
     self._detect_assets()
 
+  @classmethod
+  def _load_asset(cls, filename, body):
+    etag = '"%s"' % hashlib.sha1(body).hexdigest()
+    mimetype, encoding = mimetypes.guess_type(filename)
+    headers = {
+      'ETag': etag,
+      'Cache-Control': 'public, max-age=%d' % cls.MAX_AGE.as_(Time.SECONDS),
+    }
+    if mimetype: headers['Content-Type'] = mimetype
+    if encoding: headers['Content-Encoding'] = encoding
+
+    # Assets that are already encoded, or that do not shrink, are only served as-is.
+    gzip_body = gzip_headers = None
+    if not encoding:
+      compressed = gzip_compress(body)
+      if len(compressed) < len(body):
+        headers['Vary'] = 'Accept-Encoding'
+        gzip_body = compressed
+        gzip_headers = dict(headers)
+        gzip_headers['Content-Encoding'] = 'gzip'
+        # The gzip variant is a different representation, so it needs its own strong ETag.
+        gzip_headers['ETag'] = '%s-gzip"' % etag[:-1]
+
+    return Asset(etag, body, headers, gzip_body, gzip_headers)
+
   def _detect_assets(self):
+    # Assets are read into memory once, at startup, and never from the request path.  The
+    # observer normally runs from a zipped pex, so they are not file-backed and cannot be mapped.
     log.info('detecting assets...')
     assets = pkg_resources.resource_listdir(__name__, 'assets')
     cached_assets = {}
     for asset in assets:
       log.info('  detected asset: %s' % asset)
-      cached_assets[asset] = pkg_resources.resource_string(
-        __name__, os.path.join('assets', asset))
+      body = pkg_resources.resource_string(__name__, os.path.join('assets', asset))
+      cached_assets[asset] = self._load_asset(asset, body)
     self._assets = cached_assets
 
   @HttpServer.route("/favicon.ico")
@@ -47,11 +111,19 @@ class StaticAssets(object):
   @HttpServer.route("/assets/:filename")
   def handle_asset(self, filename):
     # TODO(wickman)  Add static_content to bottle.
-    if filename in self._assets:
-      mimetype, encoding = mimetypes.guess_type(filename)
-      headers = {}
-      if mimetype: headers['Content-Type'] = mimetype
-      if encoding: headers['Content-Encoding'] = encoding
-      return HTTPResponse(self._assets[filename], header=headers)
-    else:
+    asset = self._assets.get(filename)
+    if asset is None:
       HttpServer.abort(404, 'Unknown asset: %s' % filename)
+
+    request_headers = HttpServer.Request.headers
+    if_none_match = request_headers.get('If-None-Match')
+    if if_none_match:
+      etags = [etag.strip() for etag in if_none_match.split(',')]
+      if asset.gzip_headers is not None and asset.gzip_headers['ETag'] in etags:
+        return HTTPResponse(status=304, header=asset.gzip_headers)
+      if asset.etag in etags or '*' in etags:
+        return HTTPResponse(status=304, header=asset.headers)
+
+    if asset.gzip_body is not None and accepts_gzip(request_headers.get('Accept-Encoding', '')):
+      return HTTPResponse(asset.gzip_body, header=asset.gzip_headers)
+    return HTTPResponse(asset.body, header=asset.headers)
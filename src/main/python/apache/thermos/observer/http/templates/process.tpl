@@ -14,6 +14,7 @@
 
  <%doc>
 Template arguments:
+  hostname
   task_id
   process {
     cpu:/ram: (optional)
@@ -35,7 +36,6 @@ Template arguments:
 </%doc>
 
 <%!
-import socket
 import time
 from xml.sax.saxutils import escape
 
@@ -44,7 +44,7 @@ def pretty_time(seconds=time.time()):
 %>
 
 <html>
-<title>thermos(${socket.gethostname()})</title>
+<title>thermos(${hostname})</title>
 
 <link rel="stylesheet"
       type="text/css"
@@ -13,30 +13,33 @@
  -->
 
  <%doc>
- Template arguments:
+ The task struct can be large, so it is streamed as JSON between the head and tail defs
+ rather than rendered by this template.
+
+ head() arguments:
   hostname
   task_id
-  task_struct
 </%doc>
 
+<%def name="head(hostname, task_id)">
 <html>
 <title>thermos(${hostname})</title>
 
 <link rel="stylesheet"
       type="text/css"
       href="/assets/bootstrap.css"/>
-<%!
-  from json import dumps
-  def print_task(task):
-    return dumps(task.get(), indent=4)
-%>
 
 <body>
 <div class="container">
   <h3> task ${task_id} </h3>
   <div class="content" id="rawTask">
-    <pre>${print_task(task_struct) | h}</pre>
+    <pre>\
+</%def>
+
+<%def name="tail()">\
+</pre>
   </div>
 </div>
 </body>
 </html>
+</%def>
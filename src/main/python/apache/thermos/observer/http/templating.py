@@ -15,6 +15,7 @@
 import os
 
 import pkg_resources
+from bottle import MakoTemplate
 
 
 class HttpTemplate(object):
@@ -22,3 +23,12 @@ class HttpTemplate(object):
   def load(name):
     return pkg_resources.resource_string(
         __name__, os.path.join('templates', '%s.tpl' % name))
+
+  @classmethod
+  def compile(cls, name, template_adapter=MakoTemplate):
+    """Load and compile a template up front.
+
+    bottle renders a template instance handed to a view as-is, rather than compiling the
+    template source on first use (or on every use when running in debug mode).
+    """
+    return template_adapter(source=cls.load(name))
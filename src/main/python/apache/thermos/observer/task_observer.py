@@ -22,6 +22,7 @@ polls a designated Thermos checkpoint root and collates information about all ta
 import os
 import threading
 import time
+from collections import namedtuple
 from operator import attrgetter
 
 from twitter.common import log
@@ -40,6 +41,9 @@ from .observed_task import ActiveObservedTask, FinishedObservedTask
 from gen.apache.thermos.ttypes import ProcessState, TaskState
 
 
+TaskSnapshot = namedtuple('TaskSnapshot', 'task state statuses processes')
+
+
 class TaskObserver(ExceptionalThread, Lockable):
   """
     The TaskObserver monitors the thermos checkpoint root for active/finished
@@ -186,7 +190,10 @@ class TaskObserver(ExceptionalThread, Lockable):
   @Lockable.sync
   def state(self, task_id):
     """Return a dict containing mapped information about a task's state"""
-    real_state = self.raw_state(task_id)
+    return self._state(self.raw_state(task_id))
+
+  @staticmethod
+  def _state(real_state):
     if real_state is None or real_state.header is None:
       return {}
     else:
@@ -208,6 +215,19 @@ class TaskObserver(ExceptionalThread, Lockable):
       return None
     return self.all_tasks[task_id].state
 
+  @Lockable.sync
+  def task_mtime(self, task_id):
+    """
+      Return the mtime of the runner checkpoint of a finished task, or None if the task is
+      unknown or still active (active tasks also report resource samples, which change
+      independently of the checkpoint.)
+    """
+    task = self.finished_tasks.get(task_id)
+    if task is None:
+      return None
+    return task.safe_mtime(
+        TaskPath(root=task.root, task_id=task_id).getpath('runner_checkpoint'))
+
   @Lockable.sync
   def _task_processes(self, task_id):
     """
@@ -218,7 +238,9 @@ class TaskObserver(ExceptionalThread, Lockable):
     """
     if task_id not in self.all_tasks:
       return {}
-    state = self.raw_state(task_id)
+    return self._process_states(self.raw_state(task_id))
+
+  def _process_states(self, state):
     if state is None or state.header is None:
       return {}
 
@@ -332,7 +354,10 @@ class TaskObserver(ExceptionalThread, Lockable):
     if task is None:
       return []
 
-    state = self.raw_state(task_id)
+    return self._statuses(self.raw_state(task_id))
+
+  @staticmethod
+  def _statuses(state):
     if state is None or state.header is None:
       return []
 
@@ -386,14 +411,15 @@ class TaskObserver(ExceptionalThread, Lockable):
     # Unknown task_id.
     if task_id not in self.all_tasks:
       return {}
+    return self._task_from_state(task_id, self.raw_state(task_id))
 
+  def _task_from_state(self, task_id, state):
     task = self.all_tasks[task_id].task
     if task is None:
       # TODO(wickman)  Can this happen?
       log.error('Could not find task: %s' % task_id)
       return {}
 
-    state = self.raw_state(task_id)
     if state is None or state.header is None:
       # TODO(wickman)  Can this happen?
       return {}
@@ -416,7 +442,7 @@ class TaskObserver(ExceptionalThread, Lockable):
        user=state.header.user,
        resource_consumption=self._sample(task_id),
        ports=state.header.ports,
-       processes=self._task_processes(task_id),
+       processes=self._process_states(state),
        task_struct=task,
     )
 
@@ -463,6 +489,31 @@ class TaskObserver(ExceptionalThread, Lockable):
         d.update(return_code=process_run.return_code)
       return d
 
+  def _process_history(self, task_id, process):
+    """Return the list of ProcessStatus runs of a process, or None if it is unknown."""
+    state = self.raw_state(task_id)
+    if state is None or state.header is None:
+      return None
+    if process not in state.processes:
+      return None
+    return state.processes[process]
+
+  def _process_run(self, task_id, process, history, run):
+    tup = self._get_process_tuple(history, run)
+    if not tup:
+      return {}
+    if tup.get('state') == 'RUNNING':
+      tup.update(used=self._get_process_resource_consumption(task_id, process))
+    return tup
+
+  def _process_runs(self, task_id, process, history, runs):
+    process_runs = {}
+    for run in map(int, runs):
+      tup = self._process_run(task_id, process, history, run)
+      if tup:
+        process_runs[run] = tup
+    return process_runs
+
   @Lockable.sync
   def process(self, task_id, process, run=None):
     """
@@ -479,19 +530,35 @@ class TaskObserver(ExceptionalThread, Lockable):
 
       If run is None, return the latest run.
     """
-    state = self.raw_state(task_id)
-    if state is None or state.header is None:
+    history = self._process_history(task_id, process)
+    if history is None:
       return {}
-    if process not in state.processes:
-      return {}
-    history = state.processes[process]
     run = int(run) if run is not None else -1
-    tup = self._get_process_tuple(history, run)
-    if not tup:
-      return {}
-    if tup.get('state') == 'RUNNING':
-      tup.update(used=self._get_process_resource_consumption(task_id, process))
-    return tup
+    return self._process_run(task_id, process, history, run)
+
+  @Lockable.sync
+  def process_bundle(self, task_id, process):
+    """
+      Returns everything needed to render a process in a single read of the task's runner
+      state:
+
+        (current_run, process, runs)
+
+      where current_run is the latest run as defined by process(), process is the
+      ThermosProcess as defined by process_from_name() and runs is a map of
+      run => process run covering every run up to and including the current one.
+
+      If the process is unknown, returns ({}, None, {}).
+    """
+    history = self._process_history(task_id, process)
+    if history is None:
+      return {}, None, {}
+    current_run = self._process_run(task_id, process, history, -1)
+    if not current_run:
+      return {}, None, {}
+    runs = self._process_runs(task_id, process, history, range(current_run['process_run']))
+    runs[current_run['process_run']] = current_run
+    return current_run, self.process_from_name(task_id, process), runs
 
   @Lockable.sync
   def _processes(self, task_id):
@@ -510,15 +577,18 @@ class TaskObserver(ExceptionalThread, Lockable):
 
     if task_id not in self.all_tasks:
       return {}
-    state = self.raw_state(task_id)
+    return self._latest_runs(task_id, self.raw_state(task_id))
+
+  def _latest_runs(self, task_id, state):
     if state is None or state.header is None:
       return {}
 
-    processes = self._task_processes(task_id)
+    processes = self._process_states(state)
     d = dict()
     for process_type in processes:
       for process_name in processes[process_type]:
-        d[process_name] = self.process(task_id, process_name)
+        d[process_name] = self._process_run(
+            task_id, process_name, state.processes[process_name], -1)
     return d
 
   @Lockable.sync
@@ -531,6 +601,26 @@ class TaskObserver(ExceptionalThread, Lockable):
       return {}
     return dict((task_id, self._processes(task_id)) for task_id in task_ids)
 
+  @Lockable.sync
+  def snapshot(self, task_id):
+    """
+      Returns a TaskSnapshot of a task computed from a single read of its runner state, or None
+      if the task is unknown:
+
+        task: as defined by _task()
+        state: as defined by state()
+        statuses: as defined by task_statuses()
+        processes: as defined by _processes()
+    """
+    if task_id not in self.all_tasks:
+      return None
+    state = self.raw_state(task_id)
+    return TaskSnapshot(
+        task=self._task_from_state(task_id, state),
+        state=self._state(state),
+        statuses=self._statuses(state),
+        processes=self._latest_runs(task_id, state))
+
   @Lockable.sync
   def get_run_number(self, runner_state, process, run=None):
     if runner_state is not None and runner_state.processes is not None:
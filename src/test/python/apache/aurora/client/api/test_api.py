@@ -13,7 +13,8 @@
 #
 import unittest
 
-from mock import create_autospec
+from mock import call, create_autospec
+from twitter.common.quantity import Amount, Time
 
 from apache.aurora.client.api import AuroraClientAPI
 from apache.aurora.common.aurora_job_key import AuroraJobKey
@@ -37,7 +38,8 @@ from gen.apache.aurora.api.ttypes import (
     ResponseCode,
     ResponseDetail,
     Result,
-    TaskConfig
+    TaskConfig,
+    TaskQuery
 )
 
 
@@ -204,3 +206,135 @@ class TestJobUpdateApis(unittest.TestCase):
     assert Resource(numCpus=1.0) in actual
     assert Resource(ramMb=32) in actual
     assert Resource(diskMb=64) in actual
+
+
+class TestResultCaching(unittest.TestCase):
+  """Read-only call caching tests."""
+
+  JOB_KEY = AuroraJobKey("foo", "role", "env", "name")
+
+  @classmethod
+  def mock_api(cls):
+    api = AuroraClientAPI(
+        Cluster(name="foo"),
+        'test-client',
+        result_cache_ttl=Amount(1, Time.MINUTES))
+    mock_proxy = create_autospec(spec=SchedulerProxyApiSpec, spec_set=True, instance=True)
+    api._scheduler_proxy = mock_proxy
+    return api, mock_proxy
+
+  def test_query_cached(self):
+    """Test identical queries are only issued once."""
+    api, mock_proxy = self.mock_api()
+    api.query(TaskQuery(role="role"))
+    api.query(TaskQuery(role="role"))
+    api.query(TaskQuery(role="other"))
+    assert mock_proxy.getTasksStatus.call_count == 2
+
+  def test_mutation_invalidates_cache(self):
+    """Test mutating calls invalidate cached results."""
+    api, mock_proxy = self.mock_api()
+    api.get_jobs("role")
+    api.kill_job(self.JOB_KEY, message='hello')
+    api.get_jobs("role")
+    assert mock_proxy.getJobs.call_count == 2
+
+  def test_reconciliation_invalidates_cache(self):
+    """Test triggering task reconciliation invalidates cached results."""
+    api, mock_proxy = self.mock_api()
+    api.query(TaskQuery(role="role"))
+    api.reconcile_explicit(10)
+    api.query(TaskQuery(role="role"))
+    api.reconcile_implicit()
+    api.query(TaskQuery(role="role"))
+    assert mock_proxy.getTasksStatus.call_count == 3
+
+  def test_cache_disabled_by_default(self):
+    """Test results are not cached unless a TTL is configured."""
+    api = AuroraClientAPI(Cluster(name="foo"), 'test-client')
+    mock_proxy = create_autospec(spec=SchedulerProxyApiSpec, spec_set=True, instance=True)
+    api._scheduler_proxy = mock_proxy
+    api.get_quota("role")
+    api.get_quota("role")
+    assert mock_proxy.getQuota.call_count == 2
+
+
+class TestBatchedKills(unittest.TestCase):
+  """Batched kill_job tests."""
+
+  JOB_KEY = AuroraJobKey("foo", "role", "env", "name")
+  OTHER_JOB_KEY = AuroraJobKey("foo", "role", "env", "other")
+
+  @classmethod
+  def mock_api(cls):
+    api = AuroraClientAPI(Cluster(name="foo"), 'test-client')
+    mock_proxy = create_autospec(spec=SchedulerProxyApiSpec, spec_set=True, instance=True)
+    api._scheduler_proxy = mock_proxy
+    return api, mock_proxy
+
+  def test_batched_kills_merged(self):
+    """Test kills against the same job are merged into one RPC."""
+    api, mock_proxy = self.mock_api()
+    with api.batched() as batch:
+      batch.kill_job(self.JOB_KEY, [0, 1], message='hello')
+      batch.kill_job(self.JOB_KEY, [2], message='hello')
+      batch.kill_job(self.OTHER_JOB_KEY, None, message='hello')
+      assert not mock_proxy.killTasks.called
+
+    assert mock_proxy.killTasks.mock_calls == [
+        call(self.JOB_KEY.to_thrift(), frozenset([0, 1, 2]), 'hello'),
+        call(self.OTHER_JOB_KEY.to_thrift(), None, 'hello')]
+    assert len(batch.responses) == 2
+
+  def test_batched_kill_all_instances(self):
+    """Test a kill of all instances subsumes instance-specific kills of the same job."""
+    api, mock_proxy = self.mock_api()
+    with api.batched() as batch:
+      batch.kill_job(self.JOB_KEY, [0], message='hello')
+      batch.kill_job(self.JOB_KEY, None, message='hello')
+
+    mock_proxy.killTasks.assert_called_once_with(self.JOB_KEY.to_thrift(), None, 'hello')
+
+  def test_batched_invalid_job_key(self):
+    """Test kills are validated when they are buffered."""
+    api, mock_proxy = self.mock_api()
+    with self.assertRaises(AuroraClientAPI.ClusterMismatch):
+      with api.batched() as batch:
+        batch.kill_job(AuroraJobKey("bar", "role", "env", "name"), [0], message='hello')
+
+    assert not mock_proxy.killTasks.called
+
+  def test_batched_discarded_on_error(self):
+    """Test buffered kills are not issued when the batch fails."""
+    api, mock_proxy = self.mock_api()
+    with self.assertRaises(ValueError):
+      with api.batched() as batch:
+        batch.kill_job(self.JOB_KEY, [0], message='hello')
+        raise ValueError()
+
+    assert not mock_proxy.killTasks.called
+
+  def test_batched_failure_attempts_remaining(self):
+    """Test a failed kill does not drop the remaining kills in the batch."""
+    api, mock_proxy = self.mock_api()
+    mock_proxy.killTasks.side_effect = [ValueError('boom'), 'response']
+    with self.assertRaises(ValueError):
+      with api.batched() as batch:
+        batch.kill_job(self.JOB_KEY, [0], message='hello')
+        batch.kill_job(self.OTHER_JOB_KEY, [0], message='hello')
+
+    assert mock_proxy.killTasks.call_count == 2
+    assert batch.responses == ['response']
+
+  def test_kill_job_not_buffered(self):
+    """Test kill_job is issued immediately and returns its response inside a batch."""
+    api, mock_proxy = self.mock_api()
+    mock_proxy.killTasks.return_value = 'response'
+    with api.batched() as batch:
+      assert api.kill_job(self.OTHER_JOB_KEY, [0], message='hello') == 'response'
+      batch.kill_job(self.JOB_KEY, [0], message='hello')
+      mock_proxy.killTasks.assert_called_once_with(
+          self.OTHER_JOB_KEY.to_thrift(), frozenset([0]), 'hello')
+
+    assert batch.responses == ['response']
+    assert mock_proxy.killTasks.call_count == 2
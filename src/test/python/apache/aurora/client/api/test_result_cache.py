@@ -0,0 +1,153 @@
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import threading
+import unittest
+from contextlib import contextmanager
+
+import mock
+import pytest
+from twitter.common.quantity import Amount, Time
+
+from apache.aurora.client.api.result_cache import ResultCache, _InflightCall
+
+
+class FakeClock(object):
+  def __init__(self):
+    self.now = 0
+
+  def time(self):
+    return self.now
+
+
+@contextmanager
+def waiting_calls():
+  """Yields an event that is set once a caller waits on an in-flight call."""
+  waiting = threading.Event()
+  wait = _InflightCall.wait
+
+  def notifying_wait(call):
+    waiting.set()
+    return wait(call)
+
+  with mock.patch.object(_InflightCall, 'wait', notifying_wait):
+    yield waiting
+
+
+def get_in_thread(cache, key, fn, outcomes):
+  def run():
+    try:
+      outcomes.append(cache.get(key, fn))
+    except Exception as e:
+      outcomes.append(e)
+  return threading.Thread(target=run)
+
+
+class TestResultCache(unittest.TestCase):
+  # Bounds the waits below so that a regression fails the test rather than hanging it.
+  TIMEOUT = 10
+  def setUp(self):
+    self.clock = FakeClock()
+    self.cache = ResultCache(ttl=Amount(2, Time.SECONDS), max_size=2, clock=self.clock)
+
+  def test_hit_within_ttl(self):
+    fn = mock.Mock(return_value='result')
+    assert self.cache.get('key', fn) == 'result'
+    self.clock.now = 1
+    assert self.cache.get('key', fn) == 'result'
+    assert fn.call_count == 1
+
+  def test_miss_after_ttl(self):
+    fn = mock.Mock(side_effect=['first', 'second'])
+    assert self.cache.get('key', fn) == 'first'
+    self.clock.now = 2
+    assert self.cache.get('key', fn) == 'second'
+    assert fn.call_count == 2
+
+  def test_distinct_keys(self):
+    assert self.cache.get('a', lambda: 1) == 1
+    assert self.cache.get('b', lambda: 2) == 2
+
+  def test_errors_not_cached(self):
+    fn = mock.Mock(side_effect=[ValueError('boom'), 'result'])
+    with pytest.raises(ValueError):
+      self.cache.get('key', fn)
+    assert self.cache.get('key', fn) == 'result'
+
+  def test_invalidate(self):
+    fn = mock.Mock(side_effect=['first', 'second'])
+    assert self.cache.get('key', fn) == 'first'
+    self.cache.invalidate()
+    assert self.cache.get('key', fn) == 'second'
+
+  def test_max_size(self):
+    self.cache.get('a', lambda: 1)
+    self.cache.get('b', lambda: 2)
+    self.cache.get('c', lambda: 3)
+    fn = mock.Mock(return_value=4)
+    assert self.cache.get('a', fn) == 4
+    assert fn.call_count == 1
+
+  def test_concurrent_misses_coalesced(self):
+    waiter_fn = mock.Mock(return_value='other')
+    outcomes = []
+    waiter = get_in_thread(self.cache, 'key', waiter_fn, outcomes)
+
+    with waiting_calls() as waiting:
+      def owner_fn():
+        waiter.start()
+        assert waiting.wait(self.TIMEOUT)
+        return 'result'
+      assert self.cache.get('key', owner_fn) == 'result'
+      waiter.join()
+
+    assert outcomes == ['result']
+    assert not waiter_fn.called
+
+  def test_invalidate_during_failed_call(self):
+    """A call that fails after an invalidation must not disturb the call that replaced it."""
+    newer_started, release_newer = threading.Event(), threading.Event()
+
+    def newer_fn():
+      newer_started.set()
+      release_newer.wait(self.TIMEOUT)
+      return 'newer'
+
+    newer_outcomes = []
+    newer = get_in_thread(self.cache, 'key', newer_fn, newer_outcomes)
+
+    def older_fn():
+      self.cache.invalidate()
+      newer.start()
+      assert newer_started.wait(self.TIMEOUT)
+      raise ValueError('boom')
+
+    with pytest.raises(ValueError):
+      self.cache.get('key', older_fn)
+
+    waiter_fn = mock.Mock(return_value='duplicate')
+    waiter_outcomes = []
+    waiter = get_in_thread(self.cache, 'key', waiter_fn, waiter_outcomes)
+    with waiting_calls() as waiting:
+      waiter.start()
+      waiting.wait(self.TIMEOUT)
+      release_newer.set()
+      newer.join()
+      waiter.join()
+
+    assert newer_outcomes == ['newer']
+    assert waiter_outcomes == ['newer']
+    assert not waiter_fn.called
+    assert self.cache.get('key', waiter_fn) == 'newer'
+    assert not waiter_fn.called
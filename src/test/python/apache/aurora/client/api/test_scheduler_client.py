@@ -12,14 +12,10 @@
 # limitations under the License.
 #
 
-import inspect
-import time
 import unittest
 
 import mock
 import pytest
-from mox import IgnoreArg, IsA, Mox
-from requests.auth import AuthBase
 from thrift.transport import TTransport
 from twitter.common.quantity import Amount, Time
 from twitter.common.zookeeper.kazoo_client import TwitterKazooClient
@@ -54,273 +50,117 @@ ROLE = 'foorole'
 JOB_NAME = 'barjobname'
 JOB_ENV = 'devel'
 JOB_KEY = JobKey(role=ROLE, environment=JOB_ENV, name=JOB_NAME)
+# Clusters are immutable, so tests share them.
+LOCAL_CLUSTER = Cluster(name='local')
+ZK_CLUSTER = Cluster(zk='zk', zk_port='2181')
+DIRECT_CLUSTER = Cluster(scheduler_uri='uri')
+SCHEDULER_URI = 'https://scheduler.example.com:1337'
 DEFAULT_RESPONSE = Response()
+OK_RESPONSE = Response(responseCode=ResponseCode.OK)
+TRANSIENT_ERROR_RESPONSE = Response(responseCode=ResponseCode.ERROR_TRANSIENT)
+TRANSIENT_ERROR_RESPONSE_WITH_DETAILS = Response(
+    responseCode=ResponseCode.ERROR_TRANSIENT,
+    details=[ResponseDetail(message="message1"), ResponseDetail(message="message2")])
+
+
+# (rpc, args) for every RPC exercised through the SchedulerProxy.  Thrift structs compare by
+# value, so the thrift client is expected to be called with args as-is.
+RPC_CASES = [
+    ('startCronJob', (JOB_KEY,)),
+    ('createJob', (JobConfiguration(),)),
+    ('replaceCronTemplate', (JobConfiguration(), Lock())),
+    ('scheduleCronJob', (JobConfiguration(),)),
+    ('descheduleCronJob', (JOB_KEY,)),
+    ('populateJobConfig', (JobConfiguration(),)),
+    ('restartShards', (JOB_KEY, {0})),
+    ('getTasksStatus', (TaskQuery(),)),
+    ('getJobs', (ROLE,)),
+    ('killTasks', (JobKey(), {0}, None)),
+    ('getQuota', (ROLE,)),
+    ('addInstances', (JobKey(), 1)),
+    ('getJobUpdateSummaries', (JobUpdateQuery(),)),
+    ('getJobUpdateDetails', ('update_id',)),
+    ('startJobUpdate', (JobUpdateRequest(),)),
+    ('pauseJobUpdate', ('update_id',)),
+    ('resumeJobUpdate', ('update_id',)),
+    ('abortJobUpdate', ('update_id',)),
+    ('rollbackJobUpdate', ('update_id',)),
+    ('pulseJobUpdate', ('update_id',)),
+    ('startMaintenance', (Hosts(),)),
+    ('drainHosts', (Hosts(),)),
+    ('maintenanceStatus', (Hosts(),)),
+    ('endMaintenance', (Hosts(),)),
+    ('setQuota', (ROLE, ResourceAggregate())),
+    ('forceTaskState', ('taskid', ScheduleStatus.LOST)),
+    ('performBackup', ()),
+    ('listBackups', ()),
+    ('stageRecovery', (TaskQuery(),)),
+    ('queryRecovery', (TaskQuery(),)),
+    ('deleteRecoveryTasks', (TaskQuery(),)),
+    ('commitRecovery', ()),
+    ('unloadRecovery', ()),
+    ('snapshot', ()),
+    ('pruneTasks', (TaskQuery(),)),
+    ('rewriteConfigs', (RewriteConfigsRequest(),)),
+    ('triggerExplicitTaskReconciliation', (ExplicitReconciliationSettings(batchSize=None),)),
+    ('triggerImplicitTaskReconciliation', ()),
+]
 
 
 def test_coverage():
   """Make sure a new thrift RPC doesn't get added without minimal test coverage."""
-  for name, klass in inspect.getmembers(AuroraAdmin) + inspect.getmembers(AuroraSchedulerManager):
-    if name.endswith('_args'):
-      rpc_name = name[:-len('_args')]
-      assert hasattr(TestSchedulerProxyAdminInjection, 'test_%s' % rpc_name), (
-          'No test defined for RPC %s' % rpc_name)
-
-
-class TestSchedulerProxyInjection(unittest.TestCase):
-  def setUp(self):
-    self.mox = Mox()
-
-    self.mox.StubOutClassWithMocks(AuroraAdmin, 'Client')
-    self.mox.StubOutClassWithMocks(scheduler_client, 'SchedulerClient')
-
-    self.mock_scheduler_client = self.mox.CreateMock(scheduler_client.SchedulerClient)
-    self.mock_thrift_client = self.mox.CreateMock(AuroraAdmin.Client)
-
-    scheduler_client.SchedulerClient.get(IgnoreArg(), verbose=IgnoreArg()).AndReturn(
-        self.mock_scheduler_client)
-    self.mock_scheduler_client.get_thrift_client().AndReturn(self.mock_thrift_client)
-
-  def tearDown(self):
-    self.mox.UnsetStubs()
-    self.mox.VerifyAll()
-
-  def make_scheduler_proxy(self):
-    return scheduler_client.SchedulerProxy(Cluster(name='local'))
-
-  def test_startCronJob(self):
-    self.mock_thrift_client.startCronJob(IsA(JobKey)).AndReturn(DEFAULT_RESPONSE)
-    self.mox.ReplayAll()
-    self.make_scheduler_proxy().startCronJob(JOB_KEY)
-
-  def test_createJob(self):
-    self.mock_thrift_client.createJob(
-        IsA(JobConfiguration)).AndReturn(DEFAULT_RESPONSE)
-    self.mox.ReplayAll()
-    self.make_scheduler_proxy().createJob(JobConfiguration())
-
-  def test_replaceCronTemplate(self):
-    self.mock_thrift_client.replaceCronTemplate(
-        IsA(JobConfiguration),
-        IsA(Lock)).AndReturn(DEFAULT_RESPONSE)
-    self.mox.ReplayAll()
-    self.make_scheduler_proxy().replaceCronTemplate(JobConfiguration(), Lock())
-
-  def test_scheduleCronJob(self):
-    self.mock_thrift_client.scheduleCronJob(
-        IsA(JobConfiguration)).AndReturn(DEFAULT_RESPONSE)
-    self.mox.ReplayAll()
-    self.make_scheduler_proxy().scheduleCronJob(JobConfiguration())
-
-  def test_descheduleCronJob(self):
-    self.mock_thrift_client.descheduleCronJob(
-        IsA(JobKey)).AndReturn(DEFAULT_RESPONSE)
-    self.mox.ReplayAll()
-    self.make_scheduler_proxy().descheduleCronJob(JOB_KEY)
-
-  def test_populateJobConfig(self):
-    self.mock_thrift_client.populateJobConfig(IsA(JobConfiguration)).AndReturn(DEFAULT_RESPONSE)
-    self.mox.ReplayAll()
-    self.make_scheduler_proxy().populateJobConfig(JobConfiguration())
-
-  def test_restartShards(self):
-    self.mock_thrift_client.restartShards(IsA(JobKey), IgnoreArg()).AndReturn(DEFAULT_RESPONSE)
-    self.mox.ReplayAll()
-    self.make_scheduler_proxy().restartShards(JOB_KEY, {0})
-
-  def test_getTasksStatus(self):
-    self.mock_thrift_client.getTasksStatus(IsA(TaskQuery)).AndReturn(DEFAULT_RESPONSE)
-    self.mox.ReplayAll()
-    self.make_scheduler_proxy().getTasksStatus(TaskQuery())
-
-  def test_getJobs(self):
-    self.mock_thrift_client.getJobs(IgnoreArg()).AndReturn(DEFAULT_RESPONSE)
-    self.mox.ReplayAll()
-    self.make_scheduler_proxy().getJobs(ROLE)
-
-  def test_killTasks(self):
-    self.mock_thrift_client.killTasks(IsA(JobKey), IgnoreArg(), None).AndReturn(DEFAULT_RESPONSE)
-    self.mox.ReplayAll()
-    self.make_scheduler_proxy().killTasks(JobKey(), {0}, None)
-
-  def test_getQuota(self):
-    self.mock_thrift_client.getQuota(IgnoreArg()).AndReturn(DEFAULT_RESPONSE)
-    self.mox.ReplayAll()
-    self.make_scheduler_proxy().getQuota(ROLE)
-
-  def test_addInstances(self):
-    self.mock_thrift_client.addInstances(IsA(JobKey), 1).AndReturn(DEFAULT_RESPONSE)
-    self.mox.ReplayAll()
-    self.make_scheduler_proxy().addInstances(JobKey(), 1)
-
-  def test_getJobUpdateSummaries(self):
-    self.mock_thrift_client.getJobUpdateSummaries(IsA(JobUpdateQuery)).AndReturn(DEFAULT_RESPONSE)
-    self.mox.ReplayAll()
-    self.make_scheduler_proxy().getJobUpdateSummaries(JobUpdateQuery())
-
-  def test_getJobUpdateDetails(self):
-    self.mock_thrift_client.getJobUpdateDetails('update_id').AndReturn(DEFAULT_RESPONSE)
-    self.mox.ReplayAll()
-    self.make_scheduler_proxy().getJobUpdateDetails('update_id')
-
-  def test_startJobUpdate(self):
-    self.mock_thrift_client.startJobUpdate(
-        IsA(JobUpdateRequest)).AndReturn(DEFAULT_RESPONSE)
-    self.mox.ReplayAll()
-    self.make_scheduler_proxy().startJobUpdate(JobUpdateRequest())
-
-  def test_pauseJobUpdate(self):
-    self.mock_thrift_client.pauseJobUpdate('update_id').AndReturn(DEFAULT_RESPONSE)
-    self.mox.ReplayAll()
-    self.make_scheduler_proxy().pauseJobUpdate('update_id')
-
-  def test_resumeJobUpdate(self):
-    self.mock_thrift_client.resumeJobUpdate(
-        'update_id').AndReturn(DEFAULT_RESPONSE)
-    self.mox.ReplayAll()
-    self.make_scheduler_proxy().resumeJobUpdate('update_id')
-
-  def test_abortJobUpdate(self):
-    self.mock_thrift_client.abortJobUpdate('update_id').AndReturn(DEFAULT_RESPONSE)
-    self.mox.ReplayAll()
-    self.make_scheduler_proxy().abortJobUpdate('update_id')
-
-  def test_rollbackJobUpdate(self):
-    self.mock_thrift_client.rollbackJobUpdate('update_id').AndReturn(DEFAULT_RESPONSE)
-    self.mox.ReplayAll()
-    self.make_scheduler_proxy().rollbackJobUpdate('update_id')
-
-  def test_pulseJobUpdate(self):
-    self.mock_thrift_client.pulseJobUpdate('update_id').AndReturn(DEFAULT_RESPONSE)
-    self.mox.ReplayAll()
-    self.make_scheduler_proxy().pulseJobUpdate('update_id')
-
-  def test_raise_auth_error(self):
-    self.mock_thrift_client.killTasks(None, None, None).AndRaise(TRequestsTransport.AuthError())
-    self.mock_scheduler_client.get_failed_auth_message().AndReturn('failed auth')
-    self.mox.ReplayAll()
-    with pytest.raises(scheduler_client.SchedulerProxy.AuthError):
-      self.make_scheduler_proxy().killTasks(None, None, None)
-
-
-class TestSchedulerProxyAdminInjection(TestSchedulerProxyInjection):
-  def test_startMaintenance(self):
-    self.mock_thrift_client.startMaintenance(
-      IsA(Hosts)).AndReturn(DEFAULT_RESPONSE)
-    self.mox.ReplayAll()
-    self.make_scheduler_proxy().startMaintenance(Hosts())
-
-  def test_drainHosts(self):
-    self.mock_thrift_client.drainHosts(IsA(Hosts)).AndReturn(DEFAULT_RESPONSE)
-    self.mox.ReplayAll()
-    self.make_scheduler_proxy().drainHosts(Hosts())
-
-  def test_maintenanceStatus(self):
-    self.mock_thrift_client.maintenanceStatus(
-      IsA(Hosts)).AndReturn(DEFAULT_RESPONSE)
-    self.mox.ReplayAll()
-    self.make_scheduler_proxy().maintenanceStatus(Hosts())
-
-  def test_endMaintenance(self):
-    self.mock_thrift_client.endMaintenance(IsA(Hosts)).AndReturn(DEFAULT_RESPONSE)
-    self.mox.ReplayAll()
-    self.make_scheduler_proxy().endMaintenance(Hosts())
-
-  def test_setQuota(self):
-    self.mock_thrift_client.setQuota(
-        IgnoreArg(),
-        IsA(ResourceAggregate)).AndReturn(DEFAULT_RESPONSE)
-    self.mox.ReplayAll()
-    self.make_scheduler_proxy().setQuota(ROLE, ResourceAggregate())
-
-  def test_forceTaskState(self):
-    self.mock_thrift_client.forceTaskState(
-        'taskid',
-        IgnoreArg()).AndReturn(DEFAULT_RESPONSE)
-    self.mox.ReplayAll()
-    self.make_scheduler_proxy().forceTaskState('taskid', ScheduleStatus.LOST)
-
-  def test_performBackup(self):
-    self.mock_thrift_client.performBackup().AndReturn(DEFAULT_RESPONSE)
-    self.mox.ReplayAll()
-    self.make_scheduler_proxy().performBackup()
-
-  def test_listBackups(self):
-    self.mock_thrift_client.listBackups().AndReturn(DEFAULT_RESPONSE)
-    self.mox.ReplayAll()
-    self.make_scheduler_proxy().listBackups()
-
-  def test_stageRecovery(self):
-    self.mock_thrift_client.stageRecovery(
-        IsA(TaskQuery)).AndReturn(DEFAULT_RESPONSE)
-    self.mox.ReplayAll()
-    self.make_scheduler_proxy().stageRecovery(TaskQuery())
-
-  def test_queryRecovery(self):
-    self.mock_thrift_client.queryRecovery(
-      IsA(TaskQuery)).AndReturn(DEFAULT_RESPONSE)
-    self.mox.ReplayAll()
-    self.make_scheduler_proxy().queryRecovery(TaskQuery())
-
-  def test_deleteRecoveryTasks(self):
-    self.mock_thrift_client.deleteRecoveryTasks(
-        IsA(TaskQuery)).AndReturn(DEFAULT_RESPONSE)
-    self.mox.ReplayAll()
-    self.make_scheduler_proxy().deleteRecoveryTasks(TaskQuery())
-
-  def test_commitRecovery(self):
-    self.mock_thrift_client.commitRecovery().AndReturn(DEFAULT_RESPONSE)
-    self.mox.ReplayAll()
-    self.make_scheduler_proxy().commitRecovery()
-
-  def test_unloadRecovery(self):
-    self.mock_thrift_client.unloadRecovery().AndReturn(DEFAULT_RESPONSE)
-    self.mox.ReplayAll()
-    self.make_scheduler_proxy().unloadRecovery()
-
-  def test_snapshot(self):
-    self.mock_thrift_client.snapshot().AndReturn(DEFAULT_RESPONSE)
-    self.mox.ReplayAll()
-    self.make_scheduler_proxy().snapshot()
-
-  def test_pruneTasks(self):
-    t = TaskQuery()
-    self.mock_thrift_client.pruneTasks(IsA(TaskQuery)).AndReturn(DEFAULT_RESPONSE)
-    self.mox.ReplayAll()
-    self.make_scheduler_proxy().pruneTasks(t)
-
-  def test_rewriteConfigs(self):
-    self.mock_thrift_client.rewriteConfigs(
-        IsA(RewriteConfigsRequest)).AndReturn(DEFAULT_RESPONSE)
-    self.mox.ReplayAll()
-    self.make_scheduler_proxy().rewriteConfigs(RewriteConfigsRequest())
-
-  def test_triggerExplicitTaskReconciliation(self):
-    self.mock_thrift_client.triggerExplicitTaskReconciliation(
-      IsA(ExplicitReconciliationSettings)).AndReturn(DEFAULT_RESPONSE)
-    self.mox.ReplayAll()
-    self.make_scheduler_proxy().triggerExplicitTaskReconciliation(
-      ExplicitReconciliationSettings(batchSize=None))
-
-  def test_triggerImplicitTaskReconciliation(self):
-    self.mock_thrift_client.triggerImplicitTaskReconciliation().AndReturn(DEFAULT_RESPONSE)
-    self.mox.ReplayAll()
-    self.make_scheduler_proxy().triggerImplicitTaskReconciliation()
+  tested_rpcs = frozenset(rpc for rpc, _ in RPC_CASES)
+  for module in (AuroraAdmin, AuroraSchedulerManager):
+    for name in vars(module):
+      if name.endswith('_args'):
+        rpc_name = name[:-len('_args')]
+        assert rpc_name in tested_rpcs, 'No test defined for RPC %s' % rpc_name
+
+
+@pytest.fixture
+def mock_scheduler_client(request):
+  patcher = mock.patch.object(
+      scheduler_client, 'SchedulerClient', spec=scheduler_client.SchedulerClient)
+  request.addfinalizer(patcher.stop)
+  return patcher.start().get.return_value
+
+
+def make_scheduler_proxy():
+  return scheduler_client.SchedulerProxy(LOCAL_CLUSTER)
+
+
+@pytest.mark.parametrize(('rpc', 'args'), RPC_CASES)
+def test_rpc(rpc, args, mock_scheduler_client):
+  mock_rpc = getattr(mock_scheduler_client.get_thrift_client.return_value, rpc)
+  mock_rpc.return_value = DEFAULT_RESPONSE
+  getattr(make_scheduler_proxy(), rpc)(*args)
+  mock_rpc.assert_called_once_with(*args)
+
+
+def test_raise_auth_error(mock_scheduler_client):
+  mock_thrift_client = mock_scheduler_client.get_thrift_client.return_value
+  mock_thrift_client.killTasks.side_effect = TRequestsTransport.AuthError()
+  mock_scheduler_client.get_failed_auth_message.return_value = 'failed auth'
+  with pytest.raises(scheduler_client.SchedulerProxy.AuthError):
+    make_scheduler_proxy().killTasks(None, None, None)
+  mock_thrift_client.killTasks.assert_called_once_with(None, None, None)
+
+
+def make_mock_time():
+  # SchedulerClient only ever sleeps between connection attempts.
+  return mock.Mock(spec=['sleep'])
 
 
 def mock_auth():
   auth_mock = mock.create_autospec(spec=AuthModule, instance=True)
-  auth_mock.auth.return_value = mock.create_autospec(AuthBase)
+  # The transport is always mocked out, so the requests auth is only ever passed through.
+  auth_mock.auth.return_value = mock.sentinel.auth
   return auth_mock
 
 
-@pytest.mark.parametrize('scheme', ('http', 'https'))
-def test_url_when_not_connected_and_cluster_has_no_proxy_url(scheme):
-  host = 'some-host.example.com'
-  port = 31181
-
-  mock_zk = mock.create_autospec(spec=TwitterKazooClient, instance=True)
-
-  service_json = '''{
+SERVICE_HOST = 'some-host.example.com'
+SERVICE_PORT = 31181
+SERVICE_JSON_TEMPLATE = '''{
     "additionalEndpoints": {
         "%(scheme)s": {
             "host": "%(host)s",
@@ -333,150 +173,162 @@ def test_url_when_not_connected_and_cluster_has_no_proxy_url(scheme):
     },
     "shard": 0,
     "status": "ALIVE"
-  }''' % dict(host=host, port=port, scheme=scheme)
-
-  service_endpoints = [ServiceInstance.unpack(service_json)]
-
-  def make_mock_client(proxy_url):
-    client = scheduler_client.ZookeeperSchedulerClient(
-        Cluster(proxy_url=proxy_url),
-        auth=None,
-        user_agent='Some-User-Agent',
-        _deadline=lambda x, **kws: x())
-    client.get_scheduler_serverset = mock.MagicMock(return_value=(mock_zk, service_endpoints))
-    client.SERVERSET_TIMEOUT = Amount(0, Time.SECONDS)
-    client._connect_scheduler = mock.MagicMock()
-    return client
-
-  client = make_mock_client(proxy_url=None)
-  assert client.url == '%s://%s:%d' % (scheme, host, port)
+  }'''
+
+
+def service_endpoint(scheme, host=SERVICE_HOST, port=SERVICE_PORT, memoized={}):
+  """Unpack the serverset endpoint for scheme://host:port once.  Callers must not modify it."""
+  key = (scheme, host, port)
+  if key not in memoized:
+    memoized[key] = ServiceInstance.unpack(
+        SERVICE_JSON_TEMPLATE % dict(host=host, port=port, scheme=scheme))
+  return memoized[key]
+
+
+def make_mock_zookeeper_client(proxy_url, service_endpoints):
+  client = scheduler_client.ZookeeperSchedulerClient(
+      Cluster(proxy_url=proxy_url),
+      auth=None,
+      user_agent='Some-User-Agent',
+      _deadline=lambda x, **kws: x())
+  mock_zk = mock.create_autospec(spec=TwitterKazooClient, instance=True)
+  client.get_scheduler_serverset = mock.MagicMock(return_value=(mock_zk, service_endpoints))
+  client.SERVERSET_TIMEOUT = Amount(0, Time.SECONDS)
+  client._connect_scheduler = mock.MagicMock()
+  return client
+
+
+@pytest.mark.parametrize('scheme', ('http', 'https'))
+def test_url_when_not_connected_and_cluster_has_no_proxy_url(scheme):
+  service_endpoints = [service_endpoint(scheme)]
+  url = '%s://%s:%d' % (scheme, SERVICE_HOST, SERVICE_PORT)
+
+  client = make_mock_zookeeper_client(None, service_endpoints)
+  assert client.url == url
   assert client.url == client.raw_url
   client._connect_scheduler.assert_has_calls([])
 
-  client = make_mock_client(proxy_url='https://scheduler.proxy')
+  client = make_mock_zookeeper_client('https://scheduler.proxy', service_endpoints)
   assert client.url == 'https://scheduler.proxy'
-  assert client.raw_url == '%s://%s:%d' % (scheme, host, port)
+  assert client.raw_url == url
   client._connect_scheduler.assert_has_calls([])
 
-  client = make_mock_client(proxy_url=None)
+  client = make_mock_zookeeper_client(None, service_endpoints)
   client.get_thrift_client()
-  assert client.url == '%s://%s:%d' % (scheme, host, port)
-  client._connect_scheduler.assert_has_calls([mock.call('%s://%s:%d/api' % (scheme, host, port))])
+  assert client.url == url
+  client._connect_scheduler.assert_has_calls([mock.call('%s/api' % url)])
   client._connect_scheduler.reset_mock()
   client.get_thrift_client()
   client._connect_scheduler.assert_has_calls([])
 
 
-class TestSchedulerClient(unittest.TestCase):
+@pytest.fixture
+def mock_transport(request):
+  patcher = mock.patch.object(scheduler_client, 'TRequestsTransport', spec=TRequestsTransport)
+  request.addfinalizer(patcher.stop)
+  mock_transport = patcher.start()
+  mock_transport.return_value.open.side_effect = [TTransport.TTransportException, True]
+  return mock_transport
+
+
+@pytest.mark.parametrize('make_client', (
+    lambda auth, user_agent: scheduler_client.SchedulerClient(auth, user_agent, verbose=True),
+    lambda auth, user_agent: scheduler_client.DirectSchedulerClient(
+        SCHEDULER_URI, auth=auth, verbose=True, user_agent=user_agent),
+    lambda auth, user_agent: scheduler_client.SchedulerClient.get(
+        ZK_CLUSTER, auth_factory=lambda _: auth, user_agent=user_agent),
+    lambda auth, user_agent: scheduler_client.SchedulerClient.get(
+        DIRECT_CLUSTER, auth_factory=lambda _: auth, user_agent=user_agent),
+), ids=('scheduler', 'direct_scheduler', 'zookeeper_cluster', 'direct_cluster'))
+def test_connect_scheduler_with_user_agent_and_auth(make_client, mock_transport):
+  auth = mock_auth()
+  user_agent = 'Some-User-Agent'
+
+  make_client(auth, user_agent)._connect_scheduler(SCHEDULER_URI, make_mock_time())
 
-  @mock.patch('apache.aurora.client.api.scheduler_client.TRequestsTransport',
-              spec=TRequestsTransport)
-  def test_connect_scheduler(self, mock_client):
-    mock_client.return_value.open.side_effect = [TTransport.TTransportException, True]
-    mock_time = mock.create_autospec(spec=time, instance=True)
+  mock_transport.assert_called_once_with(
+      SCHEDULER_URI,
+      auth=auth.auth(),
+      user_agent=user_agent,
+      session_factory=mock.ANY)
 
+
+def test_connect_scheduler_without_bypass_leader_redirect(mock_transport):
+  mock_time = make_mock_time()
+
+  auth = mock_auth()
+  user_agent = 'Some-User-Agent'
+
+  client = scheduler_client.SchedulerClient(
+      auth,
+      user_agent,
+      verbose=True,
+      bypass_leader_redirect=False)
+
+  client._connect_scheduler(SCHEDULER_URI, mock_time)
+
+  mock_transport.assert_called_once_with(
+      SCHEDULER_URI,
+      auth=auth.auth(),
+      user_agent=user_agent,
+      session_factory=mock.ANY)
+
+  _, _, kwargs = mock_transport.mock_calls[0]
+  session = kwargs['session_factory']()
+  assert session.headers.get(BYPASS_LEADER_REDIRECT_HEADER_NAME) is None
+
+
+def test_connect_scheduler_with_bypass_leader_redirect(mock_transport):
+  mock_time = make_mock_time()
+
+  auth = mock_auth()
+  user_agent = 'Some-User-Agent'
+
+  client = scheduler_client.SchedulerClient(
+      auth,
+      user_agent,
+      verbose=True,
+      bypass_leader_redirect=True)
+
+  client._connect_scheduler(SCHEDULER_URI, mock_time)
+
+  mock_transport.assert_called_once_with(
+      SCHEDULER_URI,
+      auth=auth.auth(),
+      user_agent=user_agent,
+      session_factory=mock.ANY)
+
+  _, _, kwargs = mock_transport.mock_calls[0]
+  session = kwargs['session_factory']()
+  assert session.headers[BYPASS_LEADER_REDIRECT_HEADER_NAME] == 'true'
+
+
+class TestSchedulerClient(unittest.TestCase):
+
+  def test_connect_scheduler(self):
+    mock_time = make_mock_time()
     client = scheduler_client.SchedulerClient(mock_auth(), 'Some-User-Agent', verbose=True)
-    client._connect_scheduler('https://scheduler.example.com:1337', mock_time)
 
-    assert mock_client.return_value.open.has_calls(mock.call(), mock.call())
+    with mock.patch.object(
+        scheduler_client, 'TRequestsTransport', spec=TRequestsTransport) as mock_transport:
+      mock_transport.return_value.open.side_effect = [TTransport.TTransportException, True]
+      client._connect_scheduler('https://scheduler.example.com:1337', mock_time)
+
+    assert mock_transport.return_value.open.call_count == 2
     mock_time.sleep.assert_called_once_with(
         scheduler_client.SchedulerClient.RETRY_TIMEOUT.as_(Time.SECONDS))
 
-  @mock.patch('apache.aurora.client.api.scheduler_client.TRequestsTransport',
-              spec=TRequestsTransport)
-  def test_connect_scheduler_with_user_agent(self, mock_transport):
-    mock_transport.return_value.open.side_effect = [TTransport.TTransportException, True]
-    mock_time = mock.create_autospec(spec=time, instance=True)
-
-    auth = mock_auth()
-    user_agent = 'Some-User-Agent'
-
-    client = scheduler_client.SchedulerClient(auth, user_agent, verbose=True)
-
-    uri = 'https://scheduler.example.com:1337'
-    client._connect_scheduler(uri, mock_time)
-
-    mock_transport.assert_called_once_with(
-        uri,
-        auth=auth.auth(),
-        user_agent=user_agent,
-        session_factory=mock.ANY)
-
-  @mock.patch('apache.aurora.client.api.scheduler_client.TRequestsTransport',
-              spec=TRequestsTransport)
-  def test_connect_scheduler_without_bypass_leader_redirect(self, mock_transport):
-    mock_transport.return_value.open.side_effect = [TTransport.TTransportException, True]
-    mock_time = mock.create_autospec(spec=time, instance=True)
-
-    auth = mock_auth()
-    user_agent = 'Some-User-Agent'
-
-    client = scheduler_client.SchedulerClient(
-        auth,
-        user_agent,
-        verbose=True,
-        bypass_leader_redirect=False)
-
-    uri = 'https://scheduler.example.com:1337'
-    client._connect_scheduler(uri, mock_time)
-
-    mock_transport.assert_called_once_with(
-        uri,
-        auth=auth.auth(),
-        user_agent=user_agent,
-        session_factory=mock.ANY)
-
-    _, _, kwargs = mock_transport.mock_calls[0]
-    session = kwargs['session_factory']()
-    assert session.headers.get(BYPASS_LEADER_REDIRECT_HEADER_NAME) is None
-
-  @mock.patch('apache.aurora.client.api.scheduler_client.TRequestsTransport',
-              spec=TRequestsTransport)
-  def test_connect_scheduler_with_bypass_leader_redirect(self, mock_transport):
-    mock_transport.return_value.open.side_effect = [TTransport.TTransportException, True]
-    mock_time = mock.create_autospec(spec=time, instance=True)
-
-    auth = mock_auth()
-    user_agent = 'Some-User-Agent'
-
-    client = scheduler_client.SchedulerClient(
-        auth,
-        user_agent,
-        verbose=True,
-        bypass_leader_redirect=True)
-
-    uri = 'https://scheduler.example.com:1337'
-    client._connect_scheduler(uri, mock_time)
-
-    mock_transport.assert_called_once_with(
-        uri,
-        auth=auth.auth(),
-        user_agent=user_agent,
-        session_factory=mock.ANY)
-
-    _, _, kwargs = mock_transport.mock_calls[0]
-    session = kwargs['session_factory']()
-    assert session.headers[BYPASS_LEADER_REDIRECT_HEADER_NAME] == 'true'
-
   @mock.patch('apache.aurora.client.api.scheduler_client.SchedulerClient',
               spec=scheduler_client.SchedulerClient)
   @mock.patch('threading._Event.wait')
   def test_transient_error(self, _, client):
-    mock_scheduler_client = mock.create_autospec(
-        spec=scheduler_client.SchedulerClient,
-        spec_set=False,
-        instance=True)
-    mock_thrift_client = mock.create_autospec(spec=AuroraAdmin.Client, instance=True)
+    mock_thrift_client = client.get.return_value.get_thrift_client.return_value
     mock_thrift_client.killTasks.side_effect = [
-        Response(responseCode=ResponseCode.ERROR_TRANSIENT,
-                 details=[ResponseDetail(message="message1"), ResponseDetail(message="message2")]),
-        Response(responseCode=ResponseCode.ERROR_TRANSIENT),
-        Response(responseCode=ResponseCode.OK)]
+        TRANSIENT_ERROR_RESPONSE_WITH_DETAILS,
+        TRANSIENT_ERROR_RESPONSE,
+        OK_RESPONSE]
 
-    mock_scheduler_client.get_thrift_client.return_value = mock_thrift_client
-    client.get.return_value = mock_scheduler_client
-
-    proxy = scheduler_client.SchedulerProxy(Cluster(name='local'))
+    proxy = scheduler_client.SchedulerProxy(LOCAL_CLUSTER)
     proxy.killTasks(JobKey(), None, None)
 
     assert mock_thrift_client.killTasks.call_count == 3
@@ -491,14 +343,14 @@ class TestSchedulerClient(unittest.TestCase):
         instance=True)
     mock_thrift_client = mock.create_autospec(spec=AuroraAdmin.Client, instance=True)
     mock_thrift_client.performBackup.side_effect = [
-      Response(responseCode=ResponseCode.ERROR_TRANSIENT),
+      TRANSIENT_ERROR_RESPONSE,
       scheduler_client.SchedulerProxy.TimeoutError,
-      Response(responseCode=ResponseCode.OK)]
+      OK_RESPONSE]
 
     mock_scheduler_client.get_thrift_client.return_value = mock_thrift_client
     mock_client.get.return_value = mock_scheduler_client
 
-    proxy = scheduler_client.SchedulerProxy(Cluster(name='local'))
+    proxy = scheduler_client.SchedulerProxy(LOCAL_CLUSTER)
     proxy.performBackup()
 
     assert mock_thrift_client.performBackup.call_count == 3
@@ -518,7 +370,7 @@ class TestSchedulerClient(unittest.TestCase):
     mock_scheduler_client.get_thrift_client.return_value = mock_thrift_client
     mock_client.get.return_value = mock_scheduler_client
 
-    proxy = scheduler_client.SchedulerProxy(Cluster(name='local'))
+    proxy = scheduler_client.SchedulerProxy(LOCAL_CLUSTER)
     with pytest.raises(scheduler_client.SchedulerProxy.NotRetriableError):
       proxy.performBackup()
 
@@ -537,12 +389,12 @@ class TestSchedulerClient(unittest.TestCase):
     mock_thrift_client = mock.create_autospec(spec=AuroraAdmin.Client, instance=True)
     mock_thrift_client.getTierConfigs.side_effect = [
       TTransport.TTransportException('error'),
-      Response(responseCode=ResponseCode.OK)
+      OK_RESPONSE
     ]
     mock_scheduler_client.get_thrift_client.return_value = mock_thrift_client
     mock_client.get.return_value = mock_scheduler_client
 
-    proxy = scheduler_client.SchedulerProxy(Cluster(name='local'))
+    proxy = scheduler_client.SchedulerProxy(LOCAL_CLUSTER)
     proxy.getTierConfigs(retry=True)
 
     assert mock_thrift_client.getTierConfigs.call_count == 2
@@ -554,7 +406,7 @@ class TestSchedulerClient(unittest.TestCase):
     mock_scheduler_client = mock.create_autospec(spec=scheduler_client.SchedulerClient,
                                                  instance=True)
     client.get.return_value = mock_scheduler_client
-    proxy = scheduler_client.SchedulerProxy(Cluster(name='local'))
+    proxy = scheduler_client.SchedulerProxy(LOCAL_CLUSTER)
 
     # unknown, transient connection error
     mock_scheduler_client.get_thrift_client.side_effect = RuntimeError
@@ -565,84 +417,6 @@ class TestSchedulerClient(unittest.TestCase):
     mock_scheduler_client.get_thrift_client.side_effect = None
     assert proxy.client() is not None
 
-  @mock.patch('apache.aurora.client.api.scheduler_client.TRequestsTransport',
-              spec=TRequestsTransport)
-  def test_connect_direct_scheduler_with_user_agent(self, mock_transport):
-    mock_transport.return_value.open.side_effect = [TTransport.TTransportException, True]
-    mock_time = mock.create_autospec(spec=time, instance=True)
-
-    auth = mock_auth()
-    user_agent = 'Some-User-Agent'
-    uri = 'https://scheduler.example.com:1337'
-
-    client = scheduler_client.DirectSchedulerClient(
-        uri,
-        auth=auth,
-        verbose=True,
-        user_agent=user_agent)
-
-    client._connect_scheduler(uri, mock_time)
-
-    mock_transport.assert_called_once_with(
-        uri,
-        auth=auth.auth(),
-        user_agent=user_agent,
-        session_factory=mock.ANY)
-
-  @mock.patch('apache.aurora.client.api.scheduler_client.TRequestsTransport',
-              spec=TRequestsTransport)
-  def test_connect_zookeeper_client_with_auth(self, mock_transport):
-    mock_transport.return_value.open.side_effect = [TTransport.TTransportException, True]
-    mock_time = mock.create_autospec(spec=time, instance=True)
-
-    user_agent = 'Some-User-Agent'
-    uri = 'https://scheduler.example.com:1337'
-    auth = mock_auth()
-    cluster = Cluster(zk='zk', zk_port='2181')
-
-    def auth_factory(_):
-      return auth
-
-    client = scheduler_client.SchedulerClient.get(
-        cluster,
-        auth_factory=auth_factory,
-        user_agent=user_agent)
-
-    client._connect_scheduler(uri, mock_time)
-
-    mock_transport.assert_called_once_with(
-        uri,
-        auth=auth.auth(),
-        user_agent=user_agent,
-        session_factory=mock.ANY)
-
-  @mock.patch('apache.aurora.client.api.scheduler_client.TRequestsTransport',
-              spec=TRequestsTransport)
-  def test_connect_direct_client_with_auth(self, mock_transport):
-    mock_transport.return_value.open.side_effect = [TTransport.TTransportException, True]
-    mock_time = mock.create_autospec(spec=time, instance=True)
-
-    user_agent = 'Some-User-Agent'
-    uri = 'https://scheduler.example.com:1337'
-    auth = mock_auth()
-    cluster = Cluster(scheduler_uri='uri')
-
-    def auth_factory(_):
-      return auth
-
-    client = scheduler_client.SchedulerClient.get(
-        cluster,
-        auth_factory=auth_factory,
-        user_agent=user_agent)
-
-    client._connect_scheduler(uri, mock_time)
-
-    mock_transport.assert_called_once_with(
-        uri,
-        auth=auth.auth(),
-        user_agent=user_agent,
-        session_factory=mock.ANY)
-
   def test_no_zk_or_scheduler_uri(self):
     cluster = None
     with self.assertRaises(TypeError):
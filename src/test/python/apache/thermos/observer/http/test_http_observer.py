@@ -0,0 +1,172 @@
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from email.utils import formatdate
+
+import mock
+import pytest
+from bottle import HTTPError
+from mako.template import Template
+from twitter.common.http.server import HttpServer
+
+from apache.thermos.observer.http.http_observer import BottleObserver
+from apache.thermos.observer.task_observer import TaskObserver
+
+MOCK_TASK_ID = 'abcd'
+MOCK_MTIME = 1400000000
+MOCK_HOSTNAME = 'observer.example.com'
+MOCK_TASK = {
+  'name': '<script>alert("hello & goodbye")</script>',
+  'processes': [{'name': 'echo', 'cmdline': "echo '<b>' > /dev/null"}],
+}
+
+# The body of rawtask.tpl before it was split into head and tail defs.
+OLD_RAWTASK_TEMPLATE = '''
+<html>
+<title>thermos(${hostname})</title>
+
+<link rel="stylesheet"
+      type="text/css"
+      href="/assets/bootstrap.css"/>
+<%!
+  from json import dumps
+  def print_task(task):
+    return dumps(task.get(), indent=4)
+%>
+
+<body>
+<div class="container">
+  <h3> task ${task_id} </h3>
+  <div class="content" id="rawTask">
+    <pre>${print_task(task_struct) | h}</pre>
+  </div>
+</div>
+</body>
+</html>
+'''
+
+
+def make_observer():
+  return BottleObserver(mock.create_autospec(spec=TaskObserver, instance=True))
+
+
+def request_with(**headers):
+  request = mock.Mock()
+  request.headers = dict((name.replace('_', '-'), value) for name, value in headers.items())
+  return mock.patch.object(HttpServer, 'Request', request)
+
+
+def patched_response():
+  return mock.patch.object(HttpServer, 'Response')
+
+
+def http_date(seconds):
+  return formatdate(seconds, usegmt=True)
+
+
+class TestConditionalRequests(object):
+
+  def test_not_modified(self):
+    """ test finished tasks are not resent when the client has the current version """
+    observer = make_observer()
+    observer._observer.task_mtime.return_value = MOCK_MTIME
+    for since in (MOCK_MTIME, MOCK_MTIME + 60):
+      with request_with(If_Modified_Since=http_date(since)):
+        response = observer._check_not_modified(MOCK_TASK_ID)
+      assert response.status_code == 304
+
+  def test_modified(self):
+    """ test finished tasks are sent with their Last-Modified time """
+    observer = make_observer()
+    observer._observer.task_mtime.return_value = MOCK_MTIME
+    for headers in ({}, {'If_Modified_Since': http_date(MOCK_MTIME - 60)}):
+      with request_with(**headers):
+        with patched_response() as mock_response:
+          assert observer._check_not_modified(MOCK_TASK_ID) is None
+      mock_response.set_header.assert_called_once_with('Last-Modified', http_date(MOCK_MTIME))
+
+  def test_active_task_not_conditional(self):
+    """ test tasks without an mtime (active tasks) are always sent in full """
+    observer = make_observer()
+    observer._observer.task_mtime.return_value = None
+    with request_with(If_Modified_Since=http_date(MOCK_MTIME)):
+      with patched_response() as mock_response:
+        assert observer._check_not_modified(MOCK_TASK_ID) is None
+    assert not mock_response.set_header.called
+
+  def test_not_modified_skips_lookup(self):
+    """ test a 304 is answered before the task is looked up """
+    observer = make_observer()
+    observer._observer.task_mtime.return_value = MOCK_MTIME
+    for handler in (observer.handle_task, observer.handle_rawtask):
+      with request_with(If_Modified_Since=http_date(MOCK_MTIME)):
+        assert handler(MOCK_TASK_ID).status_code == 304
+    assert not observer._observer.snapshot.called
+    assert not observer._observer._task.called
+    assert not observer._observer.state.called
+
+
+class TestMain(object):
+
+  @classmethod
+  def main(cls, observer, *args):
+    # Call the handler itself rather than the view that renders its result.
+    return BottleObserver.handle_main(observer, *args)
+
+  def test_main(self):
+    """ test the task type and numeric offset and count are passed to the observer """
+    observer = make_observer()
+    assert self.main(observer) == observer._observer.main.return_value
+    observer._observer.main.assert_called_once_with(None, None, None)
+    for args, expected in ((('all', '-20', '10'), ('all', -20, 10)),
+                           (('finished', '5'), ('finished', 5, None))):
+      observer._observer.main.reset_mock()
+      self.main(observer, *args)
+      observer._observer.main.assert_called_once_with(*expected)
+
+  def test_main_invalid(self):
+    """ test unknown task types and non-numeric offsets or counts are not found """
+    observer = make_observer()
+    for args in (('bogus',), ('all', 'abc'), ('all', '+5'), ('all', ' 5'), ('all', '0', 'abc'),
+                 ('all', '0', '10x')):
+      with pytest.raises(HTTPError) as e:
+        self.main(observer, *args)
+      assert e.value.status_code == 404
+    assert not observer._observer.main.called
+
+
+class TestRawTask(object):
+
+  @classmethod
+  def pre(cls, page):
+    return page[page.index('<pre>'):page.index('</pre>')]
+
+  def test_rawtask_matches_rendered(self):
+    """ test the streamed raw task page matches the page rendered in one piece """
+    observer = make_observer()
+    observer._observer.task_mtime.return_value = None
+    task_struct = mock.Mock()
+    task_struct.get.return_value = MOCK_TASK
+    observer._observer._task.return_value = {'task_struct': task_struct}
+    observer._observer.state.return_value = {'hostname': MOCK_HOSTNAME}
+
+    page = ''.join(observer.handle_rawtask(MOCK_TASK_ID))
+    rendered = Template(OLD_RAWTASK_TEMPLATE).render(
+        hostname=MOCK_HOSTNAME,
+        task_id=MOCK_TASK_ID,
+        task_struct=task_struct)
+
+    assert self.pre(page) == self.pre(rendered)
+    assert page.split() == rendered.split()
+    assert '<script>' not in page
@@ -0,0 +1,109 @@
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import threading
+from contextlib import contextmanager
+
+import mock
+import pytest
+from twitter.common.quantity import Amount, Time
+
+from apache.thermos.observer.http.lookup_cache import LookupCache, _PendingLookup
+
+MOCK_KEY = ('task', 'abcd')
+MOCK_TTL = Amount(500, Time.MILLISECONDS)
+# Bounds the waits below so that a regression fails the test rather than hanging it.
+TIMEOUT = 10
+
+
+@contextmanager
+def waiting_lookups():
+  """ yields an event that is set once another request waits on a running lookup """
+  waiting = threading.Event()
+  wait = _PendingLookup.wait
+
+  def notifying_wait(lookup):
+    waiting.set()
+    return wait(lookup)
+
+  with mock.patch.object(_PendingLookup, 'wait', notifying_wait):
+    yield waiting
+
+
+def lookup_in_thread(cache, key, fn, outcomes):
+  def run():
+    try:
+      outcomes.append(cache.get(key, fn))
+    except Exception as e:
+      outcomes.append(e)
+  return threading.Thread(target=run)
+
+
+class TestLookupCache(object):
+
+  def test_lookup_shared_by_concurrent_callers(self):
+    """ test concurrent lookups of the same key share a single call """
+    cache = LookupCache(MOCK_TTL)
+    other_fn = mock.Mock(return_value='other')
+    outcomes = []
+    thread = lookup_in_thread(cache, MOCK_KEY, other_fn, outcomes)
+
+    with waiting_lookups() as waiting:
+      def fn():
+        thread.start()
+        assert waiting.wait(TIMEOUT)
+        return 'owner'
+      assert cache.get(MOCK_KEY, fn) == 'owner'
+      thread.join()
+
+    assert outcomes == ['owner']
+    assert not other_fn.called
+
+  def test_lookup_expires(self):
+    """ test lookup results are reused until the ttl has passed """
+    clock = mock.Mock()
+    cache = LookupCache(MOCK_TTL, clock=clock)
+    fn = mock.Mock(side_effect=['first', 'second'])
+    ttl = MOCK_TTL.as_(Time.SECONDS)
+
+    clock.time.return_value = 100.0
+    assert cache.get(MOCK_KEY, fn) == 'first'
+    clock.time.return_value = 100.0 + ttl / 2
+    assert cache.get(MOCK_KEY, fn) == 'first'
+    clock.time.return_value = 100.0 + ttl
+    assert cache.get(MOCK_KEY, fn) == 'second'
+    assert fn.call_count == 2
+
+  def test_lookup_failure_raised_to_waiters(self):
+    """ test requests waiting on a failed lookup fail with its error rather than retrying """
+    cache = LookupCache(MOCK_TTL)
+    error = ValueError('boom')
+    other_fn = mock.Mock(return_value='other')
+    outcomes = []
+    thread = lookup_in_thread(cache, MOCK_KEY, other_fn, outcomes)
+
+    with waiting_lookups() as waiting:
+      def fn():
+        thread.start()
+        assert waiting.wait(TIMEOUT)
+        raise error
+      with pytest.raises(ValueError):
+        cache.get(MOCK_KEY, fn)
+      thread.join()
+
+    assert outcomes == [error]
+    assert not other_fn.called
+
+    # Failures are not remembered.
+    assert cache.get(MOCK_KEY, other_fn) == 'other'
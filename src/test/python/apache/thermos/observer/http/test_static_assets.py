@@ -0,0 +1,94 @@
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import gzip
+from io import BytesIO
+
+import mock
+from twitter.common.http.server import HttpServer
+
+from apache.thermos.observer.http.static_assets import StaticAssets, accepts_gzip
+
+MOCK_ASSET = 'observer.js'
+MOCK_BODY = b'var observer = {};\n' * 100
+
+
+class PatchingStaticAssets(StaticAssets):
+  def _detect_assets(self):
+    self._assets = {MOCK_ASSET: self._load_asset(MOCK_ASSET, MOCK_BODY)}
+
+
+def request_with(**headers):
+  request = mock.Mock()
+  request.headers = dict((name.replace('_', '-'), value) for name, value in headers.items())
+  return mock.patch.object(HttpServer, 'Request', request)
+
+
+class TestStaticAssets(object):
+
+  def test_handle_asset_plain(self):
+    """ test assets are served uncompressed by default """
+    assets = PatchingStaticAssets()
+    with request_with():
+      response = assets.handle_asset(MOCK_ASSET)
+    assert response.body == MOCK_BODY
+    assert response.headers['ETag'] == assets._assets[MOCK_ASSET].etag
+    assert 'Content-Encoding' not in response.headers
+
+  def test_handle_asset_gzip(self):
+    """ test assets are served gzipped when the client accepts it """
+    assets = PatchingStaticAssets()
+    with request_with(Accept_Encoding='gzip, deflate'):
+      response = assets.handle_asset(MOCK_ASSET)
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['ETag'] == assets._assets[MOCK_ASSET].gzip_headers['ETag']
+    assert response.headers['ETag'] != assets._assets[MOCK_ASSET].etag
+    assert gzip.GzipFile(fileobj=BytesIO(response.body)).read() == MOCK_BODY
+
+  def test_handle_asset_gzip_refused(self):
+    """ test assets are served uncompressed when the client refuses gzip """
+    assets = PatchingStaticAssets()
+    for accept_encoding in ('gzip;q=0', 'deflate, gzip; q=0.0', '*;q=0'):
+      with request_with(Accept_Encoding=accept_encoding):
+        response = assets.handle_asset(MOCK_ASSET)
+      assert response.body == MOCK_BODY
+      assert 'Content-Encoding' not in response.headers
+
+  def test_handle_asset_not_modified(self):
+    """ test assets are not resent when the client has the current version """
+    assets = PatchingStaticAssets()
+    with request_with(If_None_Match=assets._assets[MOCK_ASSET].etag):
+      response = assets.handle_asset(MOCK_ASSET)
+    assert response.status_code == 304
+
+  def test_handle_asset_gzip_not_modified(self):
+    """ test gzipped assets are not resent when the client has the current version """
+    assets = PatchingStaticAssets()
+    gzip_etag = assets._assets[MOCK_ASSET].gzip_headers['ETag']
+    with request_with(If_None_Match=gzip_etag, Accept_Encoding='gzip'):
+      response = assets.handle_asset(MOCK_ASSET)
+    assert response.status_code == 304
+    assert response.headers['ETag'] == gzip_etag
+
+
+def test_accepts_gzip():
+  assert accepts_gzip('gzip')
+  assert accepts_gzip('gzip, deflate')
+  assert accepts_gzip('deflate, GZIP;q=0.5')
+  assert accepts_gzip('deflate, *')
+  assert not accepts_gzip('')
+  assert not accepts_gzip('deflate')
+  assert not accepts_gzip('gzip;q=0')
+  assert not accepts_gzip('gzip;q=0.000, *')
+  assert not accepts_gzip('*;q=0')
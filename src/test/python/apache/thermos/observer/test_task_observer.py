@@ -0,0 +1,130 @@
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+
+import mock
+from twitter.common.contextutil import temporary_dir
+from twitter.common.dirutil import touch
+
+from apache.thermos.common.path import TaskPath
+from apache.thermos.config.schema import Process, Task
+from apache.thermos.monitoring.detector import FixedPathDetector
+from apache.thermos.observer.observed_task import ActiveObservedTask, FinishedObservedTask
+from apache.thermos.observer.task_observer import TaskObserver
+
+from gen.apache.thermos.ttypes import (
+    ProcessState,
+    ProcessStatus,
+    RunnerHeader,
+    RunnerState,
+    TaskState,
+    TaskStatus
+)
+
+MOCK_TASK_ID = 'abcd'
+MOCK_BASE_PATH = '/a/b/c'
+MOCK_TASK = Task(
+    name='hello_world',
+    processes=[
+        Process(name='hello', cmdline='echo hello'),
+        Process(name='world', cmdline='echo world'),
+        Process(name='waiting', cmdline='echo waiting')])
+MOCK_STATE = RunnerState(
+    header=RunnerHeader(
+        task_id=MOCK_TASK_ID,
+        launch_time_ms=1000,
+        sandbox='/sandbox',
+        hostname='localhost',
+        user='user',
+        ports={'http': 8080}),
+    statuses=[
+        TaskStatus(state=TaskState.ACTIVE, timestamp_ms=1000),
+        TaskStatus(state=TaskState.FAILED, timestamp_ms=9000)],
+    processes={
+        'hello': [
+            ProcessStatus(process='hello', seq=1, state=ProcessState.FAILED, start_time=2.0,
+                          stop_time=3.0, return_code=1),
+            ProcessStatus(process='hello', seq=2, state=ProcessState.FAILED, start_time=4.0,
+                          stop_time=5.0, return_code=1),
+            ProcessStatus(process='hello', seq=3, state=ProcessState.SUCCESS, start_time=6.0,
+                          stop_time=7.0, return_code=0)],
+        'world': [
+            ProcessStatus(process='world', seq=1, state=ProcessState.KILLED, start_time=2.0,
+                          stop_time=8.0)],
+        'waiting': []})
+
+
+def make_observer(root=MOCK_BASE_PATH):
+  return TaskObserver(FixedPathDetector(root))
+
+
+def make_finished_observer():
+  observer = make_observer()
+  observed_task = mock.create_autospec(spec=FinishedObservedTask, instance=True)
+  observed_task.task = MOCK_TASK
+  observed_task.state = MOCK_STATE
+  observer._finished_tasks[MOCK_TASK_ID] = observed_task
+  return observer
+
+
+def test_process_bundle():
+  observer = make_finished_observer()
+  for process in ('hello', 'world'):
+    current_run = observer.process(MOCK_TASK_ID, process)
+    runs = dict((run, observer.process(MOCK_TASK_ID, process, run))
+                for run in range(current_run['process_run']))
+    runs[current_run['process_run']] = current_run
+    assert observer.process_bundle(MOCK_TASK_ID, process) == (
+        current_run, observer.process_from_name(MOCK_TASK_ID, process), runs)
+
+
+def test_process_bundle_unknown():
+  observer = make_finished_observer()
+  unknown = ((MOCK_TASK_ID, 'waiting'), (MOCK_TASK_ID, 'unknown'), ('efgh', 'hello'))
+  for task_id, process in unknown:
+    assert observer.process(task_id, process) == {}
+    assert observer.process_bundle(task_id, process) == ({}, None, {})
+
+
+def test_snapshot():
+  observer = make_finished_observer()
+  snapshot = observer.snapshot(MOCK_TASK_ID)
+  assert snapshot.task == observer._task(MOCK_TASK_ID)
+  assert snapshot.state == observer.state(MOCK_TASK_ID)
+  assert snapshot.statuses == observer.task_statuses(MOCK_TASK_ID)
+  assert snapshot.processes == observer._processes(MOCK_TASK_ID)
+  assert observer.snapshot('efgh') is None
+
+
+def test_task_mtime_finished():
+  with temporary_dir() as root:
+    checkpoint = TaskPath(root=root, task_id=MOCK_TASK_ID).getpath('runner_checkpoint')
+    touch(checkpoint)
+    observer = make_observer(root)
+    observer._finished_tasks[MOCK_TASK_ID] = FinishedObservedTask(root, MOCK_TASK_ID)
+    assert observer.task_mtime(MOCK_TASK_ID) == os.path.getmtime(checkpoint)
+
+
+def test_task_mtime_active():
+  with temporary_dir() as root:
+    observer = make_observer(root)
+    observer._active_tasks[MOCK_TASK_ID] = mock.create_autospec(
+        spec=ActiveObservedTask, instance=True)
+    assert observer.task_mtime(MOCK_TASK_ID) is None
+
+
+def test_task_mtime_unknown():
+  with temporary_dir() as root:
+    assert make_observer(root).task_mtime(MOCK_TASK_ID) is None